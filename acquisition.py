@@ -0,0 +1,132 @@
+import threading
+import time
+from array import array
+
+from metrics import Histogram
+
+# --- Kruhový buffer vzorků (jeden zapisovatel, libovolný počet čtenářů) ---
+# Zapisuje jen akviziční vlákno, čtenáři si drží vlastní kurzor. Index head
+# se posune až po zapsání celého slotu, takže není potřeba zámek.
+class RingBuffer:
+    def __init__(self, capacity=4096, channels=8):
+        self.capacity = capacity
+        self.channels = channels
+        self.samples = array('H', bytes(2 * capacity * channels))
+        self.stamps = array('q', bytes(8 * capacity))   # monotónní ns
+        self.head = 0
+
+    def write(self, values, stamp):
+        slot = self.head % self.capacity
+        base = slot * self.channels
+        samples = self.samples
+        for c in range(self.channels):
+            samples[base + c] = values[c]
+        self.stamps[slot] = stamp
+        self.head += 1
+
+    def cursor(self):
+        return self.head
+
+    # Zavolá callback(samples, base, stamp) pro každý nový sken od kurzoru,
+    # vrací nový kurzor a počet skenů, které čtenář nestihl (přepsané)
+    def read(self, cursor, callback):
+        head = self.head
+        lost = 0
+        if head - cursor > self.capacity:
+            lost = head - self.capacity - cursor
+            cursor = head - self.capacity
+        nch = self.channels
+        cap = self.capacity
+        while cursor < head:
+            slot = cursor % cap
+            callback(self.samples, slot * nch, self.stamps[slot])
+            cursor += 1
+        return cursor, lost
+
+# --- Statistika odstupu skenů (jitter) ---
+class JitterStats:
+    def __init__(self):
+        self.gaps = Histogram("scan_gap")
+        self.last = None
+
+    def add(self, stamp):
+        if self.last is not None:
+            self.gaps.add(stamp - self.last)
+        self.last = stamp
+
+    def summary(self):
+        s = self.gaps.summary()
+        return {
+            "scans": s["count"] + (self.last is not None),
+            "mean_us": s["mean_us"],
+            "p99_us": s["p99_us"],
+            "max_us": s["max_us"],
+        }
+
+# --- Akviziční vlákno: co nejrychleji skenuje ADC do bufferu ---
+# Každý sken dostane razítko monotónních hodin v ns, sejmuté těsně před
+# přenosem (okamžik vzorkování prvního kanálu). setup() se zavolá na začátku
+# ve vlákně (priorita, jádro - realtime.py).
+class AcquisitionThread(threading.Thread):
+    def __init__(self, scanner, ring, period=0.0005, setup=None):
+        super().__init__(name="acquisition", daemon=True)
+        self.scanner = scanner
+        self.ring = ring
+        self.period = period
+        self.setup = setup
+        self.running = True
+        self.scans = 0
+        self.jitter = JitterStats()
+
+    def run(self):
+        if self.setup:
+            self.setup()
+        scan = self.scanner.scan
+        write = self.ring.write
+        jitter = self.jitter
+        clock = time.monotonic_ns
+        period = int(self.period * 1e9)
+        deadline = clock()
+        while self.running:
+            stamp = clock()
+            write(scan(), stamp)
+            jitter.add(stamp)
+            self.scans += 1
+            deadline += period
+            delay = deadline - clock()
+            if delay > 0:
+                time.sleep(delay / 1e9)
+            else:
+                # Nestíháme -> nedoháníme zpětně, jen pustíme ostatní vlákna
+                deadline = clock()
+                time.sleep(0)
+
+    def stop(self):
+        self.running = False
+
+# --- Konzumentské vlákno: zpracovává vzorky z bufferu (detekce úderů) ---
+class ConsumerThread(threading.Thread):
+    def __init__(self, ring, callback, period=0.0005, name="consumer", setup=None):
+        super().__init__(name=name, daemon=True)
+        self.ring = ring
+        self.callback = callback
+        self.period = period
+        self.setup = setup
+        self.running = True
+        self.lost = 0
+
+    def run(self):
+        if self.setup:
+            self.setup()
+        ring = self.ring
+        callback = self.callback
+        cursor = ring.cursor()
+        while self.running:
+            if ring.head == cursor:
+                time.sleep(self.period)
+                continue
+            cursor, lost = ring.read(cursor, callback)
+            self.lost += lost
+
+    def stop(self):
+        self.running = False
@@ -0,0 +1,180 @@
+import json
+import mmap
+import queue
+import struct
+import sys
+import threading
+from array import array
+
+# --- Binární záznam surových vzorků ADC ---
+# Hlavička souboru: "ZVTR", verze, počet kanálů, délka JSONu, JSON s
+#   nastavením (preset, frekvence...), zarovnáno na 8 bajtů
+# Blok: "BLCK", počet skenů n, rezerva; pak n časových razítek int64
+#   (monotónní ns) a n * kanálů vzorků uint16 (little-endian)
+# Vše zarovnané, takže čtení = mmap a memoryview.cast bez kopírování.
+
+MAGIC = b"ZVTR"
+VERSION = 1
+FILE_HEADER = struct.Struct("<4sHHI")
+BLOCK_MAGIC = b"BLCK"
+BLOCK_HEADER = struct.Struct("<4sIQ")
+BLOCK_SCANS = 1024
+
+def _pad8(n):
+    return (8 - n % 8) % 8
+
+class TraceWriter:
+    def __init__(self, path, channels=8, meta=None):
+        self.channels = channels
+        self.f = open(path, "wb")
+        info = json.dumps(meta or {}).encode("utf-8")
+        info += b" " * _pad8(FILE_HEADER.size + len(info))
+        self.f.write(FILE_HEADER.pack(MAGIC, VERSION, channels, len(info)))
+        self.f.write(info)
+
+    def write_block(self, stamps, samples, n):
+        stamps = stamps[:n]
+        samples = samples[:n * self.channels]
+        if sys.byteorder == "big":
+            stamps.byteswap()
+            samples.byteswap()
+        self.f.write(BLOCK_HEADER.pack(BLOCK_MAGIC, n, 0))
+        self.f.write(stamps.tobytes())
+        data = samples.tobytes()
+        self.f.write(data + b"\0" * _pad8(len(data)))
+
+    def close(self):
+        self.f.close()
+
+# --- Nahrávání z kruhového bufferu ---
+# callback() běží v konzumentském vlákně a jen kopíruje do předalokovaného
+# bloku; plné bloky zapisuje na disk samostatné vlákno.
+class TraceRecorder:
+    def __init__(self, path, channels=8, meta=None, block_scans=BLOCK_SCANS):
+        self.writer = TraceWriter(path, channels, meta)
+        self.channels = channels
+        self.block_scans = block_scans
+        self.free = queue.SimpleQueue()
+        self.full = queue.SimpleQueue()
+        for _ in range(3):
+            self.free.put(self._new_block())
+        self.stamps, self.samples = self._new_block()
+        self.n = 0
+        self.scans = 0
+        self.dropped = 0
+        self.thread = threading.Thread(target=self._run, name="trace-writer", daemon=True)
+        self.thread.start()
+
+    def _new_block(self):
+        return (array('q', bytes(8 * self.block_scans)),
+                array('H', bytes(2 * self.block_scans * self.channels)))
+
+    def callback(self, adc, base, stamp):
+        n = self.n
+        self.stamps[n] = stamp
+        nch = self.channels
+        samples = self.samples
+        o = n * nch
+        for c in range(nch):
+            samples[o + c] = adc[base + c]
+        self.n = n + 1
+        self.scans += 1
+        if self.n == self.block_scans:
+            try:
+                free = self.free.get_nowait()
+            except queue.Empty:
+                # Disk nestíhá: blok se zahodí a přepíše
+                self.dropped += self.n
+                self.n = 0
+                return
+            self.full.put((self.stamps, self.samples, self.n))
+            self.stamps, self.samples = free
+            self.n = 0
+
+    def _run(self):
+        while True:
+            item = self.full.get()
+            if item is None:
+                break
+            stamps, samples, n = item
+            self.writer.write_block(stamps, samples, n)
+            self.free.put((stamps, samples))
+
+    def close(self):
+        if self.n:
+            self.full.put((self.stamps, self.samples, self.n))
+        self.full.put(None)
+        self.thread.join()
+        self.writer.close()
+
+# --- Čtení: mmap, bloky jako memoryview polí ---
+class TraceReader:
+    def __init__(self, path):
+        self.f = open(path, "rb")
+        self.mm = mmap.mmap(self.f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, channels, info_len = FILE_HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC:
+            raise ValueError("Není záznam ADC")
+        if version != VERSION:
+            raise ValueError(f"Nepodporovaná verze záznamu: {version}")
+        if sys.byteorder == "big":
+            raise ValueError("Čtení přes mmap předpokládá little-endian")
+        self.channels = channels
+        start = FILE_HEADER.size
+        self.meta = json.loads(bytes(self.mm[start:start + info_len]) or b"{}")
+        self.blocks = []
+        # Záznam useknutý uprostřed bloku (SIGTERM, výpadek napájení) se čte
+        # do posledního celého bloku
+        self.truncated = False
+        view = memoryview(self.mm)
+        off = start + info_len
+        while off + BLOCK_HEADER.size <= len(self.mm):
+            bmagic, n, _ = BLOCK_HEADER.unpack_from(self.mm, off)
+            if bmagic != BLOCK_MAGIC:
+                raise ValueError(f"Poškozený blok na offsetu {off}")
+            off += BLOCK_HEADER.size
+            size = 2 * n * channels
+            if off + 8 * n + size > len(self.mm):
+                self.truncated = True
+                break
+            stamps = view[off:off + 8 * n].cast('q')
+            off += 8 * n
+            samples = view[off:off + size].cast('H')
+            off += size + _pad8(size)
+            self.blocks.append((stamps, samples))
+        if off < len(self.mm):
+            self.truncated = True
+        self.scans = sum(len(s) for s, _ in self.blocks)
+
+    # Jednotlivé skeny: (razítko ns, seznam hodnot kanálů)
+    def __iter__(self):
+        nch = self.channels
+        for stamps, samples in self.blocks:
+            for i in range(len(stamps)):
+                yield stamps[i], list(samples[i * nch:(i + 1) * nch])
+
+    def frames(self):
+        return [values for _, values in self]
+
+    def close(self):
+        self.blocks = []
+        self.mm.close()
+        self.f.close()
+
+def is_trace(path):
+    with open(path, "rb") as f:
+        return f.read(4) == MAGIC
+
+# --- python adctrace.py záznam.zvt [--csv] ---
+if __name__ == "__main__":
+    reader = TraceReader(sys.argv[1])
+    if "--csv" in sys.argv:
+        for stamp, values in reader:
+            print(stamp, ",".join(map(str, values)))
+    else:
+        stamps = [s for s, _ in reader]
+        span = (stamps[-1] - stamps[0]) / 1e9 if len(stamps) > 1 else 0
+        print(f"Kanálů: {reader.channels}, skenů: {reader.scans}, bloků: {len(reader.blocks)}"
+              + (" (useknutý, čteno do posledního celého bloku)" if reader.truncated else ""))
+        print(f"Délka: {span:.3f} s, frekvence: {(len(stamps) - 1) / span if span else 0:.0f} Hz")
+        print("Nastavení:", json.dumps(reader.meta))
@@ -4,6 +4,7 @@ import time
 import random
 import spidev
 from RPLCD.i2c import CharLCD
+from mcp3208 import MCP3208Scanner
 import RPi.GPIO as GPIO
 
 VERSION = "1.0"
@@ -93,11 +94,13 @@ def loadShitFromJSON():
     except Exception:
         pass
 
-# --- Čtení kanálu z MCP3208 ---
-def read_channel(channel):
-    adc = spi.xfer2([6 | (channel >> 2), (channel & 3) << 6, 0])
-    data = ((adc[1] & 15) << 8) | adc[2]
-    return data
+# --- Skenování všech aktivních kanálů MCP3208 ---
+scanner = MCP3208Scanner(spi, speed_hz=spi.max_speed_hz)
+
+def update_scan_channels():
+    scanner.set_channels([c for c in range(NUM_CHANNELS) if preset[currentPreset][c]['active']])
+
+update_scan_channels()
 
 # --- Výběr pole pro editaci (indexy odpovídají selection) ---
 def get_edit_fields(ch):
@@ -191,24 +194,27 @@ try:
                 editLastBlink = now_blink
                 show_big(selection, editMode)
 
-        # Čtení správného kanálu z MCP3208
-        val = read_channel(currentChannel)
-        velocity = int((val / 4095) * 100)
-        now = time.time()
-
+        # Čtení všech aktivních kanálů z MCP3208 v jednom průchodu
+        values = scanner.scan()
+        now = time.monotonic_ns()
+
+        # Detekce úderu s thresholdy a debounce na všech kanálech
+        for c in scanner.channels:
+            val = values[c]
+            ch = preset[currentPreset][c]
+            if ch['armed'] and val > ch['hitThreshold']:
+                if (now - ch['last_hit_time']) / 1000000 > ch['debounce']:
+                    ch['hitCount'] += 1
+                    ch['barCount'] += 1
+                    ch['velocity'] = int((val / 4095) * 100)
+                    ch['last_hit_time'] = now
+                    ch['armed'] = False
+                    if c == currentChannel:
+                        show_small()
+                        show_big(selection, editMode)
+            if not ch['armed'] and val < ch['releaseThreshold']:
+                ch['armed'] = True
         ch = preset[currentPreset][currentChannel]
-        # Detekce úderu s thresholdy a debounce
-        if ch['armed'] and val > ch['hitThreshold']:
-            if (now - ch['last_hit_time']) * 1000 > ch['debounce']:
-                ch['hitCount'] += 1
-                ch['barCount'] += 1
-                ch['velocity'] = velocity
-                ch['last_hit_time'] = now
-                ch['armed'] = False
-                show_small()
-                show_big(selection, editMode)
-        if not ch['armed'] and val < ch['releaseThreshold']:
-            ch['armed'] = True
 
         # --- Ovládání tlačítek ---
         if GPIO.input(BUTTON_LEFT) == GPIO.LOW:
@@ -248,6 +254,7 @@ try:
                 # Přepínání hodnot podle typu pole (příklad pro čísla a bool)
                 if isinstance(val_before, bool):
                     set_edit_field(ch, selection-1, not val_before)
+                    update_scan_channels()
                 elif isinstance(val_before, int):
                     set_edit_field(ch, selection-1, val_before + step_size)
                 show_big(selection, editMode)
@@ -257,6 +264,7 @@ try:
                 val_before = get_edit_fields(ch)[selection-1]
                 if isinstance(val_before, bool):
                     set_edit_field(ch, selection-1, not val_before)
+                    update_scan_channels()
                 elif isinstance(val_before, int):
                     set_edit_field(ch, selection-1, max(0,val_before - step_size))
                 show_big(selection, editMode)
@@ -277,6 +285,7 @@ try:
 
         if GPIO.input(BUTTON_NEXT_PRESET) == GPIO.LOW:
             currentPreset = (currentPreset + 1) % NUM_PRESETS
+            update_scan_channels()
             show_small()
             show_big(selection, editMode)
             time.sleep(0.2)
@@ -4,6 +4,7 @@ import time
 import random
 import spidev
 from RPLCD.i2c import CharLCD
+from mcp3208 import MCP3208Scanner
 import RPi.GPIO as GPIO
 
 VERSION = "1.2"
@@ -80,11 +81,13 @@ editBlinkState = True
 editLastBlink = time.time()
 BLINK_INTERVAL = 0.4
 
-# --- Čtení kanálu z MCP3208 ---
-def read_channel(channel):
-    adc = spi.xfer2([6 | (channel >> 2), (channel & 3) << 6, 0])
-    data = ((adc[1] & 15) << 8) | adc[2]
-    return data
+# --- Skenování všech aktivních kanálů MCP3208 ---
+scanner = MCP3208Scanner(spi, speed_hz=spi.max_speed_hz)
+
+def update_scan_channels():
+    scanner.set_channels([c for c in range(NUM_CHANNELS) if preset[currentPreset][c]['active']])
+
+update_scan_channels()
 
 # --- Pomocné funkce pro editaci ---
 def get_field_and_value(ch, idx):
@@ -207,24 +210,27 @@ try:
                 editLastBlink = now_blink
                 show_big(selection, editMode, editBlinkState)
 
-        # Čtení správného kanálu z MCP3208 a update malého displeje
-        val = read_channel(currentChannel)
-        velocity = int((val / 4095) * 100)
-        now = time.time()
+        # Čtení všech aktivních kanálů z MCP3208 v jednom průchodu
+        values = scanner.scan()
+        now = time.monotonic_ns()
 
-        ch = preset[currentPreset][currentChannel]
-        # Detekce úderu s thresholdy a debounce
-        if ch['armed'] and val > ch['hitThreshold']:
-            if (now - ch['last_hit_time']) * 1000 > ch['debounce']:
-                ch['hitCount'] += 1
-                ch['barCount'] += 1
-                ch['velocity'] = velocity
-                ch['last_hit_time'] = now
-                ch['armed'] = False
-                show_small()
-                show_big(selection, editMode, editBlinkState)
-        if not ch['armed'] and val < ch['releaseThreshold']:
-            ch['armed'] = True
+        # Detekce úderu s thresholdy a debounce na všech kanálech
+        for c in scanner.channels:
+            val = values[c]
+            ch = preset[currentPreset][c]
+            if ch['armed'] and val > ch['hitThreshold']:
+                if (now - ch['last_hit_time']) / 1000000 > ch['debounce']:
+                    ch['hitCount'] += 1
+                    ch['barCount'] += 1
+                    ch['velocity'] = int((val / 4095) * 100)
+                    ch['last_hit_time'] = now
+                    ch['armed'] = False
+                    # Displej jen pro právě zobrazený kanál
+                    if c == currentChannel:
+                        show_small()
+                        show_big(selection, editMode, editBlinkState)
+            if not ch['armed'] and val < ch['releaseThreshold']:
+                ch['armed'] = True
 
         # Ovládání tlačítek pro pohyb mezi buňkami
         if GPIO.input(BUTTON_LEFT) == GPIO.LOW and not editMode:
@@ -255,10 +261,12 @@ try:
         if editMode:
             if GPIO.input(BUTTON_UP) == GPIO.LOW:
                 set_field_value(preset[currentPreset][currentChannel], selection, up=True)
+                update_scan_channels()
                 show_big(selection, editMode, True)
                 time.sleep(0.2)
             if GPIO.input(BUTTON_DOWN) == GPIO.LOW:
                 set_field_value(preset[currentPreset][currentChannel], selection, up=False)
+                update_scan_channels()
                 show_big(selection, editMode, True)
                 time.sleep(0.2)
 
@@ -1,21 +1,264 @@
-import os
-import json
+import sys
 import time
-import random
-import spidev
-from RPLCD.i2c import CharLCD
-import RPi.GPIO as GPIO
+import queue
+import signal
+import argparse
+import threading
+from startup import StartupTimer
+
+# Měření studeného startu (od spuštění procesu po první detekovaný sken)
+startup = StartupTimer()
+
+import hal
+from mcp3208 import MCP3208Scanner
+from acquisition import RingBuffer, AcquisitionThread, ConsumerThread
+from hits import HitDetector
+from sequencer import Sequencer
+from velocity import VelocityMap
+from noisefloor import NoiseTracker
+from crosstalk import CrosstalkSuppressor
+from realtime import RealtimeMode
+from metrics import Metrics
+from hitstream import HitStream, HIT_SOCKET
+from midiout import MidiOutput, open_midi
+from lcdframe import FrameBuffer, LcdWriter
+from buttons import ButtonInput, PRESS, REPEAT
+from playback import Mixer, NullSink, open_sink
+from samplecache import SampleCache
+from library import SampleLibrary
+from channels import new_bank, RuntimeTable, ADC_MAX, PLAY_OPTIONS
+from persist import PresetStore
 
 VERSION = "1.3"
+startup.phase("imports")
+
+# --- Hardware nebo simulace (python b4.py --sim --adc trace.txt --buttons script.txt) ---
+parser = argparse.ArgumentParser()
+parser.add_argument("--sim", action="store_true", help="simulovaný hardware místo SPI/GPIO/I2C")
+parser.add_argument("--adc", help="soubor s průběhy ADC pro simulaci")
+parser.add_argument("--buttons", help="scénář tlačítek pro simulaci")
+parser.add_argument("--duration", type=float, help="ukončit po N sekundách")
+parser.add_argument("--scan-period", type=float, default=0.0005, help="perioda skenování ADC v s (0 = naplno)")
+parser.add_argument("--record", help="nahrávat surové vzorky ADC do souboru (.zvt)")
+parser.add_argument("--realtime", action="store_true",
+                    help="SCHED_FIFO, vyhrazené jádro a zamčená paměť pro skenování a detekci")
+parser.add_argument("--rt-cpu", type=int, help="jádro pro skenování v režimu --realtime (výchozí poslední)")
+parser.add_argument("--metrics", action="store_true",
+                    help="měřit časy fází (výpis: kill -USR1, při ukončení)")
+parser.add_argument("--hit-socket", nargs="?", const=HIT_SOCKET, metavar="CESTA",
+                    help=f"posílat údery odběratelům přes Unix socket (výchozí {HIT_SOCKET})")
+parser.add_argument("--midi", nargs="?", const="auto", metavar="CÍL",
+                    help="MIDI noty z úderů: /dev/snd/midiCxDy, virtual, soubor.mid (výchozí první zařízení)")
+parser.add_argument("--learn-crosstalk", type=float, metavar="S",
+                    help="N sekund učit přeslechy (udeřit postupně do každého padu), pak uložit")
+args = parser.parse_args()
+
+# Měření fází smyčky; vypnuté nechá funkce beze změny
+metrics = Metrics(args.metrics)
 
-# --- LCD ---
-lcd_small = CharLCD('PCF8574', 0x26, cols=16, rows=2)
-lcd_big = CharLCD('PCF8574', 0x27, cols=20, rows=4)
+if args.sim:
+    backend = hal.open_backend("sim", adc_file=args.adc, button_file=args.buttons)
+else:
+    backend = hal.open_backend("pi")
+GPIO = backend.gpio
+startup.phase("backend")
+
+# --- Start: nejdřív skenování ADC a detekce, zbytek potom ---
+# Presety, index samplů a samply se načítají na pozadí (background_init),
+# LCD a tlačítka se inicializují v hlavním vlákně, až detekce běží.
+# Do načtení presetů se detekuje s výchozím nastavením na všech kanálech.
 
 # --- SPI pro MCP3208 (CS0 = GPIO8) ---
-spi = spidev.SpiDev()
-spi.open(0, 0)
-spi.max_speed_hz = 1350000
+spi = backend.open_spi(0, 0, 1350000)
+
+# --- Globální proměnné a preset struktura ---
+NUM_PRESETS = 8
+NUM_CHANNELS = 8
+playOptions = [1 + 0.5 * i for i in range(PLAY_OPTIONS)]  # 1, 1.5, ..., 32.5
+
+# Nastavení kanálů (ukládá se) a běhový stav (pole indexovaná presetem a kanálem)
+preset = new_bank(NUM_PRESETS, NUM_CHANNELS)
+currentPreset = 0
+runtime = RuntimeTable(NUM_PRESETS, NUM_CHANNELS)
+
+# --- Skenování všech aktivních kanálů MCP3208 ---
+scanner = MCP3208Scanner(spi, speed_hz=spi.max_speed_hz)
+metrics.instrument(scanner, "scan", "spi")
+
+def update_scan_channels():
+    scanner.set_channels([c for c in range(NUM_CHANNELS) if preset[currentPreset][c].active])
+
+update_scan_channels()
+
+# --- Přehrávání samplů (předem načtené v paměti, mix po blocích) ---
+AUDIO_OUTPUT = "null" if args.sim else "auto"   # "auto" = zvuková karta, "null" nebo "soubor.wav" pro měření
+SAMPLE_CACHE_BYTES = 64 * 1024 * 1024
+mixer = Mixer()
+metrics.instrument(mixer, "render", "mix")
+
+# --- Detekce úderů (běží ve vlastním vlákně nad kruhovým bufferem) ---
+hitEvents = queue.SimpleQueue()
+
+# Sekvencer rozhodne podle počtu úderů (barCount), jestli se sample zahraje
+sequencer = Sequencer(playOptions, NUM_CHANNELS)
+# Špička ADC -> velocity a zesílení (křivka, citlivost, channelVolume) z tabulek
+velocityMap = VelocityMap(NUM_CHANNELS)
+
+# Údery pro další programy (záznam, vizualizace) přes Unix socket
+hitStream = HitStream(args.hit_socket) if args.hit_socket else None
+
+# MIDI výstup: note-on s úderem, note-off při znovuodjištění kanálu (midi.json = noty)
+midi = None
+if args.midi:
+    try:
+        midi = MidiOutput(open_midi(args.midi), NUM_CHANNELS)
+        midi.load()
+    except (OSError, RuntimeError) as e:
+        print("MIDI nejde otevřít:", e)
+
+def on_hit(c, peak, now):
+    velocity = velocityMap.velocity[c][peak]
+    i = runtime.hit(currentPreset, c, velocity, now)
+    if hitStream:
+        hitStream.publish(c, currentPreset, velocity, now, runtime.hitCount[i])
+    if sequencer.fires(c, runtime.barCount[i] - 1):
+        mixer.trigger_gain(c, velocityMap.gain[c][peak], now)
+        if midi:
+            midi.note_on(c, velocity, now)
+    hitEvents.put(c)
+
+# Přeslechy mezi pady (matice poměrů z crosstalk.json)
+crosstalk = CrosstalkSuppressor(NUM_CHANNELS)
+crosstalk.load()
+crosstalk.learning = bool(args.learn_crosstalk)
+
+hitDetector = HitDetector(on_hit, NUM_CHANNELS, crosstalk, on_release=midi.note_off if midi else None)
+hitDetector.load_preset(preset[currentPreset])
+
+def detect_hits(adc, base, now):
+    hitDetector.process(adc, base, now, scanner.channels)
+    if crosstalk.learning:
+        crosstalk.observe(adc, base, now)
+
+# Volitelně reálný čas: akvizice a detekce na vyhrazeném jádře s SCHED_FIFO
+realtime = None
+if args.realtime:
+    realtime = RealtimeMode(cpu=args.rt_cpu)
+    realtime.setup_process()
+    startup.phase("realtime")
+
+ring = RingBuffer(capacity=4096, channels=NUM_CHANNELS)
+acquisition = AcquisitionThread(scanner, ring, period=args.scan_period,
+                                setup=realtime and (lambda: realtime.setup_thread("akvizice")))
+detect_hits = metrics.wrap("detect", detect_hits)
+detector = ConsumerThread(ring, detect_hits, name="detector",
+                          setup=realtime and (lambda: realtime.setup_thread("detekce", offset=1)))
+startup.phase("adc")
+
+acquisition.start()
+detector.start()
+# Připraveno = první sken je v bufferu a detekce nad ním běží
+waitUntil = time.monotonic() + 1.0
+while acquisition.scans == 0 and acquisition.is_alive() and time.monotonic() < waitUntil:
+    time.sleep(0.0005)
+startup.mark_ready()
+startup.phase("detect")
+
+# --- Šum na vstupech: kalibrace prahů a sledování driftu (další čtenář bufferu) ---
+CALIBRATION_TIME = 3.0   # s, pady musí být v klidu
+NOISE_CHECK = 2.0        # s mezi kontrolami driftu
+calibrationResults = queue.SimpleQueue()
+noise = NoiseTracker(hitDetector, NUM_CHANNELS, on_done=calibrationResults.put)
+noiseThread = ConsumerThread(ring, noise.callback, name="noise")
+noiseThread.start()
+
+# --- Načtení samplů z USB/SD, presetů a zvuku (na pozadí) ---
+SAMPLES_PATH = "/media/tom/ZVUKY1/"
+
+# Uložené presety: binární banka; starý presets.json se při prvním startu převezme
+PRESETS_FILE = "presets.bin"
+LEGACY_PRESETS_FILE = "presets.json"
+presetStore = PresetStore(PRESETS_FILE)
+metrics.instrument(presetStore, "write", "save")
+
+library = None
+sampleCache = None
+audioSink = None
+initError = None
+
+# Načtený sample (na pozadí) předat kanálům, které ho mají vybraný
+def on_sample_ready(name, data):
+    for c in range(NUM_CHANNELS):
+        if preset[currentPreset][c].sound == name:
+            mixer.set_sound(c, data)
+
+# Samply aktuálního presetu jsou v cache připnuté, ostatní se dočítají líně
+def load_preset_sounds():
+    names = [ch.sound for ch in preset[currentPreset]]
+    for c, name in enumerate(names):
+        mixer.set_sound(c, sampleCache.get(name))
+    sampleCache.pin(names)
+
+def load_presets():
+    bank, current = presetStore.load(NUM_PRESETS, NUM_CHANNELS, library.first())
+    migrated = False
+    if bank is None:
+        bank, current = PresetStore(LEGACY_PRESETS_FILE).load(NUM_PRESETS, NUM_CHANNELS, library.first())
+        migrated = bank is not None
+    if bank is None:
+        bank = new_bank(NUM_PRESETS, NUM_CHANNELS, library.first())
+    return bank, current, migrated
+
+def start_audio():
+    sink = open_sink(AUDIO_OUTPUT)
+    sink.start(mixer)
+    return sink
+
+def background_init():
+    global library, sampleCache, audioSink, currentPreset, initError
+    try:
+        # Index z minula je k dispozici hned, přeskenování karty běží dál na pozadí
+        library = startup.measure("library", SampleLibrary, SAMPLES_PATH)
+        library.rescan_async(lambda: print("Loaded samples:", len(library) - 1))
+
+        bank, current, migrated = startup.measure("presets", load_presets)
+        preset[:] = bank
+        currentPreset = current
+        presetStore.attach(preset, currentPreset)
+        if migrated:
+            presetStore.set_current(currentPreset)
+        update_scan_channels()
+        hitDetector.load_preset(preset[currentPreset])
+        sequencer.load_preset(preset[currentPreset])
+        velocityMap.load_preset(preset[currentPreset])
+
+        sampleCache = SampleCache(SAMPLES_PATH, budget=SAMPLE_CACHE_BYTES, on_ready=on_sample_ready)
+        startup.measure("samples", load_preset_sounds)
+    except Exception as e:
+        if not startup.failed:
+            startup.fail("init", e)
+        initError = e
+        return
+    # Bez zvukového výstupu (např. chybí zařízení) běží detekce a UI dál
+    try:
+        audioSink = startup.measure("audio", start_audio)
+    except Exception as e:
+        print("Zvukový výstup nejde otevřít, zvuk jde do NullSink:", e)
+        audioSink = NullSink()
+        audioSink.start(mixer)
+
+initThread = threading.Thread(target=background_init, name="init", daemon=True)
+initThread.start()
+
+# --- LCD (přes framebuffer, posílají se jen změněné znaky) ---
+LCD_SMALL_FPS = 25   # max. obnovení za sekundu
+LCD_BIG_FPS = 15
+lcd_small = FrameBuffer(backend.open_lcd(0x26, 16, 2), 2, 16, max_fps=LCD_SMALL_FPS)
+lcd_big = FrameBuffer(backend.open_lcd(0x27, 20, 4), 4, 20, max_fps=LCD_BIG_FPS)
+metrics.instrument(lcd_small, "write_pending", "i2c_sm")
+metrics.instrument(lcd_big, "write_pending", "i2c_big")
+lcdWriter = LcdWriter([lcd_small, lcd_big])
+startup.phase("lcd")
 
 # --- GPIO tlačítka ---
 BUTTON_EDIT = 17
@@ -23,61 +266,19 @@ BUTTON_LEFT = 27
 BUTTON_RIGHT = 22
 BUTTON_UP = 23
 BUTTON_DOWN = 24
+BUTTON_NEXT_PRESET = 19
+BUTTON_RESET = 26
+BUTTONS = [BUTTON_EDIT, BUTTON_LEFT, BUTTON_RIGHT, BUTTON_UP, BUTTON_DOWN, BUTTON_NEXT_PRESET, BUTTON_RESET]
 
 GPIO.setmode(GPIO.BCM)
-for pin in [BUTTON_EDIT, BUTTON_LEFT, BUTTON_RIGHT, BUTTON_UP, BUTTON_DOWN]:
+for pin in BUTTONS:
     GPIO.setup(pin, GPIO.IN, pull_up_down=GPIO.PUD_UP)
 
-# --- Načtení samplů z USB/SD ---
-def loadSamplesFromSD(path="/media/tom/ZVUKY1/"):
-    samples = ["Empty"]
-    try:
-        for fname in os.listdir(path):
-            # Ignoruj skryté soubory a ty s prefixem ._
-            if fname.startswith('.') or fname.startswith('._'):
-                continue
-            if fname.lower().endswith(".wav"):
-                samples.append(fname[:-4])
-        if len(samples) == 1:
-            return ["Card Error!"]
-        return samples
-    except Exception as e:
-        print("Chyba při čtení složky:", e)
-        return ["Card Error!"]
-
-samples = loadSamplesFromSD()
-print("Loaded samples:", samples)
-
-# --- Globální proměnné a preset struktura ---
-NUM_PRESETS = 8
-NUM_CHANNELS = 8
-playOptions = [1 + 0.5 * i for i in range(64)]  # 1, 1.5, ..., 32.5
-
-preset = [
-    [
-        {
-            'active': True,
-            'sound': samples[0],
-            'velocity': 0,
-            'hitCount': 0,
-            'barCount': 0,
-            'playFix': True,
-            'playEvery': 0,
-            'playPosition': 0,
-            'randomFrom': 0,
-            'randomTo': 1,
-            'channelVolume': 10,
-            'hitThreshold': 60,
-            'releaseThreshold': 59,
-            'debounce': 50,
-            'last_hit_time': 0,
-            'armed': True
-        }
-        for _ in range(NUM_CHANNELS)
-    ] for _ in range(NUM_PRESETS)
-]
+# Hrany tlačítek do fronty, nahoru/dolu s auto-repeatem
+buttons = ButtonInput(GPIO, BUTTONS, repeat_pins=[BUTTON_UP, BUTTON_DOWN])
+metrics.instrument(buttons, "poll", "buttons")
+startup.phase("buttons")
 
-currentPreset = 0
 currentChannel = 0
 selection = 0   # 0 až 8 (sample + 4+4 buněk)
 editMode = False
@@ -85,79 +286,118 @@ editBlinkState = True
 editLastBlink = time.time()
 BLINK_INTERVAL = 0.4
 
-# --- Čtení kanálu z MCP3208 ---
-def read_channel(channel):
-    adc = spi.xfer2([6 | (channel >> 2), (channel & 3) << 6, 0])
-    data = ((adc[1] & 15) << 8) | adc[2]
-    return data
+# UI potřebuje presety a seznam samplů
+initThread.join()
+startup.phase("init-wait")
+if initError is not None:
+    print(startup.report())
+    print("Start se nepovedl:", initError)
+    acquisition.stop()
+    detector.stop()
+    noiseThread.stop()
+    if hitStream:
+        hitStream.stop()
+    if midi:
+        midi.close()
+    buttons.close()
+    spi.close()
+    lcd_small.lcd.clear()
+    lcd_big.lcd.clear()
+    GPIO.cleanup()
+    sys.exit(1)
+
+# Nahrávání surových vzorků (další čtenář bufferu, zápis na disk ve vlastním vlákně)
+recorder = None
+if args.record:
+    from adctrace import TraceRecorder
+    recorder = TraceRecorder(args.record, NUM_CHANNELS, {
+        'version': VERSION,
+        'scanPeriod': args.scan_period,
+        'preset': currentPreset,
+        'channels': [{k: getattr(ch, k) for k in ('active', 'hitThreshold', 'releaseThreshold', 'debounce', 'scanWindow')}
+                     for ch in preset[currentPreset]],
+    })
+    recordThread = ConsumerThread(ring, recorder.callback, name="recorder")
 
 # --- Pomocné funkce pro editaci ---
 def get_field_and_value(ch, idx):
     if idx == 0:
-        return "sound", ch['sound']
+        return "sound", ch.sound
     if idx == 1:
-        return "active", "On" if ch['active'] else "Off"
+        return "active", "On" if ch.active else "Off"
     if idx == 2:
-        return "playFix", "Fix" if ch['playFix'] else "Ran"
+        return "playFix", "Fix" if ch.playFix else "Ran"
+    # V režimu Ran jsou ve stejných buňkách meze náhodného odstupu
     if idx == 3:
-        return "playEvery", f"{playOptions[ch['playEvery']]:.1f}"
+        if not ch.playFix:
+            return "randomFrom", f"{playOptions[ch.randomFrom]:.1f}"
+        return "playEvery", f"{playOptions[ch.playEvery]:.1f}"
     if idx == 4:
-        return "playPosition", f"{playOptions[ch['playPosition']]:.1f}"
+        if not ch.playFix:
+            return "randomTo", f"{playOptions[ch.randomTo]:.1f}"
+        return "playPosition", f"{playOptions[ch.playPosition]:.1f}"
     if idx == 5:
-        return "channelVolume", str(ch['channelVolume'])
+        return "channelVolume", str(ch.channelVolume)
     if idx == 6:
-        return "hitThreshold", str(ch['hitThreshold'])
+        return "hitThreshold", str(ch.hitThreshold)
     if idx == 7:
-        return "releaseThreshold", str(ch['releaseThreshold'])
+        return "releaseThreshold", str(ch.releaseThreshold)
     if idx == 8:
-        return "debounce", str(ch['debounce'])
+        return "debounce", str(ch.debounce)
 
-def set_field_value(ch, idx, up=True):
+def set_field_value(ch, idx, up=True, mult=1):
+    # mult = násobek kroku při dlouhém držení tlačítka
     if idx == 0: # sample výběr
-        cur_idx = samples.index(ch['sound']) if ch['sound'] in samples else 0
-        if up:
-            cur_idx = (cur_idx + 1) % len(samples)
-        else:
-            cur_idx = (cur_idx - 1) % len(samples)
-        ch['sound'] = samples[cur_idx]
+        ch.sound = library.step(ch.sound, mult if up else -mult)
     elif idx == 1:
-        ch['active'] = not ch['active']
+        ch.active = not ch.active
     elif idx == 2:
-        ch['playFix'] = not ch['playFix']
+        ch.playFix = not ch.playFix
+    elif idx == 3 and not ch.playFix:
+        ch.randomFrom = min(max(ch.randomFrom + (mult if up else -mult), 0), len(playOptions)-1)
+    elif idx == 4 and not ch.playFix:
+        ch.randomTo = min(max(ch.randomTo + (mult if up else -mult), 0), len(playOptions)-1)
     elif idx == 3:
-        ch['playEvery'] = min(max(ch['playEvery'] + (1 if up else -1), 0), len(playOptions)-1)
+        ch.playEvery = min(max(ch.playEvery + (mult if up else -mult), 0), len(playOptions)-1)
     elif idx == 4:
-        ch['playPosition'] = min(max(ch['playPosition'] + (1 if up else -1), 0), len(playOptions)-1)
+        ch.playPosition = min(max(ch.playPosition + (mult if up else -mult), 0), len(playOptions)-1)
     elif idx == 5:
-        step = 1
-        ch['channelVolume'] = min(max(ch['channelVolume'] + (step if up else -step),1),10)
+        step = 1 * mult
+        ch.channelVolume = min(max(ch.channelVolume + (step if up else -step),1),10)
     elif idx == 6:
-        step = 10
-        ch['hitThreshold'] = min(max(ch['hitThreshold'] + (step if up else -step),0),100)
+        step = 10 * mult
+        ch.hitThreshold = min(max(ch.hitThreshold + (step if up else -step),0),ADC_MAX)
     elif idx == 7:
-        step = 10
-        ch['releaseThreshold'] = min(max(ch['releaseThreshold'] + (step if up else -step),0),ch['hitThreshold'])
+        step = 10 * mult
+        ch.releaseThreshold = min(max(ch.releaseThreshold + (step if up else -step),0),ch.hitThreshold)
     elif idx == 8:
-        step = 10
-        ch['debounce'] = min(max(ch['debounce'] + (step if up else -step),0),9999)
+        step = 10 * mult
+        ch.debounce = min(max(ch.debounce + (step if up else -step),0),9999)
 
 # --- Malý displej ---
 def show_small():
     lcd_small.cursor_pos = (0, 0)
-    lcd_small.write_string(f"PR {currentPreset+1:02d}   CH {currentChannel+1:02d}   ")
+    if noise.calibrating:
+        lcd_small.write_string("KALIBRACE...    ")
+    else:
+        lcd_small.write_string(f"PR {currentPreset+1:02d}   CH {currentChannel+1:02d}   ")
     lcd_small.cursor_pos = (1, 0)
     lcd_small.write_string(
-        f"{preset[currentPreset][currentChannel]['barCount']:04d}    "
-        f"{preset[currentPreset][currentChannel]['velocity']:04d}    "
+        f"{runtime.barCount[runtime.index(currentPreset, currentChannel)]:04d}    "
+        f"{runtime.velocity[runtime.index(currentPreset, currentChannel)]:04d}    "
     )
+    lcd_small.flush()
 
 # --- Velký displej ---
 def show_big(selection=0, editMode=False, blinkState=True):
+    if diagPage:
+        show_diag()
+        return
     ch = preset[currentPreset][currentChannel]
     lcd_big.cursor_mode = 'hide'
 
     # První dva řádky: název samplu s prefixem jen na začátku prvního řádku
-    name = ch['sound']
+    name = ch.sound
     prefix_char = "-" if selection==0 and not editMode else "*"
     disp_name = name if not (selection==0 and editMode and not blinkState) else ""
     lcd_big.cursor_pos = (0,0)
@@ -196,13 +436,85 @@ def show_big(selection=0, editMode=False, blinkState=True):
         lcd_big.cursor_mode='blink'
     else:
         lcd_big.cursor_mode='line'
+    lcd_big.flush()
+
+# --- Diagnostika na velkém displeji (NEXT_PRESET v editaci) ---
+# Rychlost UI smyčky a skenování, pak fáze s nejhorším časem: p99 a max v ms
+diagPage = False
+loopRate = 0.0
+scanRate = 0.0
+
+def show_diag():
+    lcd_big.cursor_mode = 'hide'
+    lcd_big.cursor_pos = (0, 0)
+    lcd_big.write_string(f"UI{loopRate:5.0f}/s ADC{scanRate:5.0f}/s"[:20])
+    worst = metrics.worst(3)
+    for row in range(3):
+        if row < len(worst):
+            h = worst[row]
+            text = f"{h.name[:7]:<7}{h.percentile(99) / 1e6:6.2f}{h.max / 1e6:7.2f}"
+        elif row == 0 and not metrics.enabled:
+            text = "mereni: --metrics"
+        else:
+            text = ""
+        lcd_big.cursor_pos = (row + 1, 0)
+        lcd_big.write_string(text[:20].ljust(20))
+    lcd_big.flush()
 
-# --- Hlavní smyčka ---
+show_small = metrics.wrap("small", show_small)
+show_big = metrics.wrap("big", show_big)
+
+# Výpis měření na požádání: kill -USR1 <pid>
+dumpRequested = False
+
+def request_dump(signum, frame):
+    global dumpRequested
+    dumpRequested = True
+
+if hasattr(signal, "SIGUSR1"):
+    signal.signal(signal.SIGUSR1, request_dump)
+
+# --- Hlavní smyčka (UI), skenování a detekce běží ve vláknech ---
+if recorder:
+    recordThread.start()
+lcdWriter.start()
+presetStore.start()
+if hitStream:
+    hitStream.start()
+backend.start()
 show_small()
 show_big(selection, editMode, editBlinkState)
+startup.phase("ui")
+print(startup.report())
+if realtime:
+    realtime.setup_gc()
+    print(realtime.report())
+runUntil = time.monotonic() + args.duration if args.duration else None
+nextNoiseCheck = time.monotonic() + NOISE_CHECK
+learnUntil = time.monotonic() + args.learn_crosstalk if args.learn_crosstalk else None
+loopStage = metrics.stage("loop") if metrics.enabled else None
+loopCount = 0
+rateStart = (time.monotonic(), 0, acquisition.scans)
 
 try:
     while True:
+        loopStart = time.perf_counter_ns()
+        loopCount += 1
+
+        # Rychlost smyčky a skenování (jednou za sekundu), diagnostika se překreslí
+        now_rate = time.monotonic()
+        if now_rate - rateStart[0] >= 1.0:
+            loopRate = (loopCount - rateStart[1]) / (now_rate - rateStart[0])
+            scanRate = (acquisition.scans - rateStart[2]) / (now_rate - rateStart[0])
+            rateStart = (now_rate, loopCount, acquisition.scans)
+            if diagPage:
+                show_diag()
+
+        if dumpRequested:
+            dumpRequested = False
+            print(metrics.dump())
+            print("Odstup skenů:", acquisition.jitter.summary())
+
         # Blikání v editMode pro zvýraznění hodnoty v buňce
         if editMode:
             now_blink = time.time()
@@ -211,63 +523,167 @@ try:
                 editLastBlink = now_blink
                 show_big(selection, editMode, editBlinkState)
 
-        # Čtení správného kanálu z MCP3208 a update malého displeje
-        val = read_channel(currentChannel)
-        velocity = int((val / 4095) * 100)
-        now = time.time()
-
-        ch = preset[currentPreset][currentChannel]
-        # Detekce úderu s thresholdy a debounce
-        if ch['armed'] and val > ch['hitThreshold']:
-            if (now - ch['last_hit_time']) * 1000 > ch['debounce']:
-                ch['hitCount'] += 1
-                ch['barCount'] += 1
-                ch['velocity'] = velocity
-                ch['last_hit_time'] = now
-                ch['armed'] = False
-                show_small()
-                show_big(selection, editMode, editBlinkState)
-        if not ch['armed'] and val < ch['releaseThreshold']:
-            ch['armed'] = True
-
-        # Ovládání tlačítek pro pohyb mezi buňkami
-        if GPIO.input(BUTTON_LEFT) == GPIO.LOW and not editMode:
-            selection -=1
-            if selection<0: selection=8
+        # Údery z detekčního vlákna -> displej jen pro právě zobrazený kanál
+        redraw = False
+        while not hitEvents.empty():
+            if hitEvents.get() == currentChannel:
+                redraw = True
+        if redraw:
+            show_small()
             show_big(selection, editMode, editBlinkState)
-            time.sleep(0.2)
 
-        if GPIO.input(BUTTON_RIGHT) == GPIO.LOW and not editMode:
-            selection +=1
-            if selection>8: selection=0
+        # Výsledek kalibrace -> prahy aktivních kanálů aktuálního presetu
+        while not calibrationResults.empty():
+            for c, suggested in enumerate(calibrationResults.get()):
+                ch = preset[currentPreset][c]
+                if not ch.active or suggested is None:
+                    continue
+                hit, release = suggested
+                ch.hitThreshold = hit
+                ch.releaseThreshold = release
+                hitDetector.configure(c, ch)
+                presetStore.mark_dirty(preset, currentPreset, c)
+                print(f"Kalibrace CH {c+1:02d}: hit {hit}, release {release}")
+            presetStore.request_save()
+            show_small()
             show_big(selection, editMode, editBlinkState)
-            time.sleep(0.2)
 
-        # Edit mode toggle a změna hodnoty v editaci
-        if GPIO.input(BUTTON_EDIT) == GPIO.LOW:
-            if not editMode:
-                editMode=True
+        # Konec učení přeslechů -> uložit matici
+        if learnUntil is not None and time.monotonic() >= learnUntil:
+            learnUntil = None
+            crosstalk.learning = False
+            crosstalk.save()
+            print("Přeslechy uloženy:", crosstalk.ratios())
+
+        # Šum stoupl nad uložený práh -> prahy detekce dočasně zvednout (neukládá se);
+        # i release, jinak by signál pod něj po úderu neklesl a kanál by se neodjistil
+        if time.monotonic() >= nextNoiseCheck:
+            nextNoiseCheck = time.monotonic() + NOISE_CHECK
+            for c in scanner.channels:
+                suggested = noise.current(c)
+                if suggested is not None:
+                    ch = preset[currentPreset][c]
+                    hit = max(ch.hitThreshold, suggested[0])
+                    hitDetector.hit_threshold[c] = hit
+                    hitDetector.release_threshold[c] = min(max(ch.releaseThreshold, suggested[1]), hit - 1)
+
+        # Tlačítka: události z fronty, nic neblokuje
+        for pin, kind, mult in buttons.poll():
+            # Na stránce diagnostiky platí jen NEXT_PRESET (zpět) a EDIT, ostatní
+            # by měnila skrytou vybranou buňku nebo spustila kalibraci
+            if diagPage and pin not in (BUTTON_NEXT_PRESET, BUTTON_EDIT):
+                continue
+
+            # Ovládání tlačítek pro pohyb mezi buňkami
+            if pin == BUTTON_LEFT and kind == PRESS and not editMode:
+                selection -=1
+                if selection<0: selection=8
                 show_big(selection, editMode, editBlinkState)
-                time.sleep(0.2)
-            else:
-                # Uložení změny a vypnutí blikání kurzoru
-                editMode=False
-                show_big(selection, editMode, True)
-                time.sleep(0.2)
 
-        # Pokud jsme v editaci a stiskneme nahoru/dolu – měníme hodnotu v aktivní buňce
-        if editMode:
-            if GPIO.input(BUTTON_UP) == GPIO.LOW:
-                set_field_value(preset[currentPreset][currentChannel], selection, up=True)
-                show_big(selection, editMode, True)
-                time.sleep(0.2)
-            if GPIO.input(BUTTON_DOWN) == GPIO.LOW:
-                set_field_value(preset[currentPreset][currentChannel], selection, up=False)
+            elif pin == BUTTON_RIGHT and kind == PRESS and not editMode:
+                selection +=1
+                if selection>8: selection=0
+                show_big(selection, editMode, editBlinkState)
+
+            # Edit mode toggle
+            elif pin == BUTTON_EDIT and kind == PRESS:
+                if not editMode:
+                    editMode=True
+                    show_big(selection, editMode, editBlinkState)
+                else:
+                    # Uložení změny a vypnutí blikání kurzoru
+                    editMode=False
+                    diagPage=False
+                    presetStore.request_save()
+                    show_big(selection, editMode, True)
+                    if realtime:
+                        realtime.idle_point()
+
+            # V editaci nahoru/dolu (i držením) mění hodnotu v aktivní buňce
+            elif pin in (BUTTON_UP, BUTTON_DOWN) and kind in (PRESS, REPEAT) and editMode:
+                set_field_value(preset[currentPreset][currentChannel], selection, up=(pin == BUTTON_UP), mult=mult)
+                presetStore.mark_dirty(preset, currentPreset, currentChannel)
+                update_scan_channels()
+                hitDetector.configure(currentChannel, preset[currentPreset][currentChannel])
+                sequencer.configure(currentChannel, preset[currentPreset][currentChannel])
+                velocityMap.configure(currentChannel, preset[currentPreset][currentChannel])
+                if selection == 0:
+                    load_preset_sounds()
                 show_big(selection, editMode, True)
-                time.sleep(0.2)
+
+            # Mimo editaci nahoru/dolu přepíná kanál
+            elif pin in (BUTTON_UP, BUTTON_DOWN) and kind == PRESS:
+                currentChannel = (currentChannel + (1 if pin == BUTTON_UP else -1)) % NUM_CHANNELS
+                show_small()
+                show_big(selection, editMode, editBlinkState)
+
+            # NEXT_PRESET v editaci přepíná diagnostiku na velkém displeji
+            elif pin == BUTTON_NEXT_PRESET and kind == PRESS and editMode:
+                diagPage = not diagPage
+                show_big(selection, editMode, editBlinkState)
+
+            elif pin == BUTTON_NEXT_PRESET and kind == PRESS:
+                currentPreset = (currentPreset + 1) % NUM_PRESETS
+                presetStore.set_current(currentPreset)
+                update_scan_channels()
+                hitDetector.load_preset(preset[currentPreset])
+                sequencer.load_preset(preset[currentPreset])
+                velocityMap.load_preset(preset[currentPreset])
+                load_preset_sounds()
+                show_small()
+                show_big(selection, editMode, editBlinkState)
+
+            # RESET v editaci = kalibrace prahů podle šumu
+            elif pin == BUTTON_RESET and kind == PRESS and editMode:
+                if not noise.calibrating:
+                    noise.calibrate(CALIBRATION_TIME)
+                    show_small()
+
+            elif pin == BUTTON_RESET and kind == PRESS:
+                runtime.reset()
+                hitDetector.reset()
+                show_small()
+                show_big(selection, editMode, editBlinkState)
+
+        if loopStage is not None:
+            loopStage.add(time.perf_counter_ns() - loopStart)
+        time.sleep(0.005)
+        if runUntil is not None and time.monotonic() >= runUntil:
+            break
 
 except KeyboardInterrupt:
-    spi.close()
-    lcd_small.clear()
-    lcd_big.clear()
-    GPIO.cleanup()
+    pass
+
+acquisition.stop()
+detector.stop()
+noiseThread.stop()
+acquisition.join()
+detector.join()
+jitter = acquisition.jitter.summary()
+print(f"Odstup skenů: průměr {jitter['mean_us']} µs, p99 {jitter['p99_us']} µs, max {jitter['max_us']} µs")
+if recorder:
+    recordThread.stop()
+    recordThread.join()
+    recorder.close()
+    print(f"Nahráno skenů: {recorder.scans}, zahozeno: {recorder.dropped + recordThread.lost}")
+lcdWriter.stop()
+presetStore.stop()
+audioSink.stop()
+if hitStream:
+    print(hitStream.stats())
+    hitStream.stop()
+if midi:
+    midi.close()
+    print(midi.stats())
+sampleCache.close()
+buttons.close()
+if metrics.enabled:
+    print(metrics.dump())
+if args.sim:
+    print(f"Skenů: {acquisition.scans}, nestihnutých: {detector.lost}")
+    print(f"Zahozené přeslechy: {list(crosstalk.rejected)}")
+    print(backend.report())
+spi.close()
+lcd_small.lcd.clear()
+lcd_big.lcd.clear()
+GPIO.cleanup()
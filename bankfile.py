@@ -0,0 +1,171 @@
+import json
+import mmap
+import struct
+import sys
+
+from channels import ADC_MAX, CONFIG_DEFAULTS, CONFIG_LIMITS, ChannelConfig, bank_to_data
+from velocity import CURVES, MAX_POINTS, MAX_VELOCITY
+
+# --- Binární banka presetů ---
+# Hlavička: "ZVPB", verze, presetů, kanálů, aktuální preset, velikost záznamu
+# Pak presetů * kanálů záznamů pevné délky, bez jakéhokoli parsování textu.
+# Záznam se rozbalí rovnou do ChannelConfig (bez slovníku); pole, která
+# starší verze nemá, dostanou výchozí hodnotu.
+
+MAGIC = b"ZVPB"
+VERSION = 4
+HEADER = struct.Struct("<4sHHHHI")
+SOUND_BYTES = 128
+
+# Verze 2: první binární banka (sada polí b4 + scanWindow v desetinách ms)
+RECORD_V2 = struct.Struct(f"<BBBBBBBxHHHH{SOUND_BYTES}s")
+# Verze 3: + křivka dynamiky, citlivost, počet bodů a body (adc, velocity)
+RECORD_V3 = struct.Struct(f"<BBBBBBBxHHHH{SOUND_BYTES}sBBH{2 * MAX_POINTS}H")
+# Verze 4: stejná pole, scanWindow v µs (desetiny ms nestačily, 1.25 -> 1.2)
+RECORD_V4 = RECORD_V3
+RECORDS = {2: RECORD_V2, 3: RECORD_V3, 4: RECORD_V4}
+
+def _encode_sound(name):
+    raw = name.encode("utf-8")
+    if len(raw) > SOUND_BYTES:
+        raise ValueError(f"Název samplu je delší než {SOUND_BYTES} B: {name}")
+    return raw
+
+# Záznam -> hodnoty v pořadí CONFIG_FIELDS
+def _values_v2(rec, window_unit=10):
+    (active, playFix, playEvery, playPosition, randomFrom, randomTo, channelVolume,
+     hitThreshold, releaseThreshold, debounce, window, sound) = rec[:12]
+    window /= window_unit
+    return (bool(active), sound.rstrip(b"\0").decode("utf-8"), bool(playFix), playEvery,
+            playPosition, randomFrom, randomTo, channelVolume, hitThreshold, releaseThreshold,
+            debounce, int(window) if window.is_integer() else window)
+
+def _values_v2_defaults(rec):
+    return _values_v2(rec) + (CONFIG_DEFAULTS['velocityCurve'], CONFIG_DEFAULTS['sensitivity'], [])
+
+def _values_v3(rec, window_unit=10):
+    curve, npoints, sensitivity = rec[12:15]
+    flat = rec[15:15 + 2 * npoints]
+    return _values_v2(rec, window_unit) + (CURVES[curve] if curve < len(CURVES) else CURVES[0], sensitivity,
+                              [[flat[i], flat[i + 1]] for i in range(0, len(flat), 2)])
+
+def _values_v4(rec):
+    return _values_v3(rec, 1000)
+
+DECODERS = {2: _values_v2_defaults, 3: _values_v3, 4: _values_v4}
+
+def _clamp(value, low, high, default):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return default
+    if value != value:
+        return default
+    return min(max(value, low), high)
+
+# Migrace slovníku kanálu na aktuální sadu polí (chybějící = výchozí).
+# Import z JSONu (b1 i ručně upravený) může obsahovat cokoli, proto se
+# každé pole ořízne do rozsahu, který umí b4 i binární záznam.
+def migrate(ch):
+    out = {field: ch.get(field, default) for field, default in CONFIG_DEFAULTS.items()}
+    for field, (low, high) in CONFIG_LIMITS.items():
+        value = _clamp(out[field], low, high, CONFIG_DEFAULTS[field])
+        if field == 'scanWindow':
+            value = float(round(value, 3))    # záznam má rozlišení 1 µs
+            out[field] = int(value) if value.is_integer() else value
+        else:
+            out[field] = int(value)
+    out['releaseThreshold'] = min(out['releaseThreshold'], out['hitThreshold'])
+    out['active'] = bool(out['active'])
+    out['playFix'] = bool(out['playFix'])
+    if not isinstance(out['sound'], str):
+        out['sound'] = CONFIG_DEFAULTS['sound']
+    if out['velocityCurve'] not in CURVES:
+        out['velocityCurve'] = CONFIG_DEFAULTS['velocityCurve']
+    points = []
+    for p in out['curvePoints'] if isinstance(out['curvePoints'], list) else []:
+        if isinstance(p, (list, tuple)) and len(p) == 2:
+            points.append([int(_clamp(p[0], 0, ADC_MAX, 0)), int(_clamp(p[1], 0, MAX_VELOCITY, 0))])
+    out['curvePoints'] = points[:MAX_POINTS]
+    return out
+
+def encode_bank(data, current=0):
+    presets = len(data)
+    channels = len(data[0]) if data else 0
+    out = bytearray(HEADER.pack(MAGIC, VERSION, presets, channels, current, RECORD_V4.size))
+    for chans in data:
+        for ch in chans:
+            ch = migrate(ch)
+            points = ch['curvePoints']
+            if len(points) > MAX_POINTS:
+                raise ValueError(f"Křivka má víc než {MAX_POINTS} bodů")
+            flat = [v for p in points for v in p] + [0] * (2 * (MAX_POINTS - len(points)))
+            out += RECORD_V4.pack(
+                ch['active'], ch['playFix'], ch['playEvery'], ch['playPosition'],
+                ch['randomFrom'], ch['randomTo'], ch['channelVolume'],
+                ch['hitThreshold'], ch['releaseThreshold'], ch['debounce'],
+                int(round(ch['scanWindow'] * 1000)), _encode_sound(ch['sound']),
+                CURVES.index(ch['velocityCurve']), len(points), ch['sensitivity'], *flat)
+    return bytes(out)
+
+# Banka -> (seznam presetů se seznamy ChannelConfig, aktuální preset)
+def decode_bank(buf):
+    magic, version, presets, channels, current, size = HEADER.unpack_from(buf, 0)
+    if magic != MAGIC:
+        raise ValueError("Není banka presetů")
+    if version not in RECORDS:
+        raise ValueError(f"Nepodporovaná verze banky: {version}")
+    unpack = RECORDS[version].unpack_from
+    values = DECODERS[version]
+    config = ChannelConfig.from_values
+    off = HEADER.size
+    bank = []
+    for p in range(presets):
+        chans = []
+        for c in range(channels):
+            chans.append(config(values(unpack(buf, off))))
+            off += size
+        bank.append(chans)
+    return bank, current
+
+def is_bank(buf):
+    return bytes(buf[:4]) == MAGIC
+
+# Načtení přes mmap, záznamy se čtou přímo z namapované stránky
+def read_bank(path):
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return decode_bank(mm)
+
+# --- JSON pro editaci na PC ---
+def export_json(data, current=0):
+    return json.dumps({"version": VERSION, "currentPreset": current, "presets": data}, indent=1,
+                      ensure_ascii=False)
+
+def import_json(text):
+    saved = json.loads(text)
+    # Starý formát (b1/bb) je jen seznam presetů, i s běhovými klíči
+    if isinstance(saved, list):
+        saved = {"presets": saved}
+    data = [[migrate(ch) for ch in chans] for chans in saved.get("presets", [])]
+    return data, int(saved.get("currentPreset", 0))
+
+# --- python bankfile.py export presets.bin presets.json | import presets.json presets.bin | info presets.bin ---
+if __name__ == "__main__":
+    cmd = sys.argv[1] if len(sys.argv) > 1 else ""
+    if cmd == "export":
+        bank, current = read_bank(sys.argv[2])
+        with open(sys.argv[3], "w", encoding="utf-8") as f:
+            f.write(export_json(bank_to_data(bank), current) + "\n")
+    elif cmd == "import":
+        with open(sys.argv[2], "r", encoding="utf-8") as f:
+            data, current = import_json(f.read())
+        with open(sys.argv[3], "wb") as f:
+            f.write(encode_bank(data, current))
+    elif cmd == "info":
+        with open(sys.argv[2], "rb") as f:
+            magic, version, presets, channels, current, size = HEADER.unpack(f.read(HEADER.size))
+        print(f"Verze {version}, presetů {presets}, kanálů {channels}, aktuální {current}, záznam {size} B")
+    else:
+        print("Použití: bankfile.py export BANKA JSON | import JSON BANKA | info BANKA")
+        sys.exit(1)
@@ -5,6 +5,7 @@ import random
 import spidev
 import RPi.GPIO as GPIO
 from RPLCD.i2c import CharLCD
+from mcp3208 import MCP3208Scanner
 
 # --- CONFIG ---
 NUM_PRESETS = 8
@@ -129,10 +130,12 @@ def show_big():
     lcd_big.write_string(row4[:20])
 
 # --- MCP3208 ---
-def read_channel(channel):
-    adc = spi.xfer2([6 | (channel >> 2), (channel & 3) << 6, 0])
-    data = ((adc[1] & 15) << 8) | adc[2]
-    return data
+scanner = MCP3208Scanner(spi, speed_hz=spi.max_speed_hz)
+
+def update_scan_channels():
+    scanner.set_channels([c for c in range(NUM_CHANNELS) if preset[currentPreset][c]['active']])
+
+update_scan_channels()
 
 # --- MAIN LOOP ---
 show_small()
@@ -140,23 +143,25 @@ show_big()
 
 try:
     while True:
-        # Čtení správného kanálu z MCP3208
-        ch = preset[currentPreset][currentChannel]
-        val = read_channel(currentChannel)
-        velocity = int((val / 4095) * 100)
-        now = time.time()
-
-        # Detekce úderu s debounce a threshold
-        if ch['armed'] and val > ch['hitThreshold']:
-            if (now - ch['last_hit_time']) * 1000 > ch['debounce']:
-                ch['hitCount'] += 1
-                ch['barCount'] += 1
-                ch['velocity'] = velocity
-                ch['last_hit_time'] = now
-                ch['armed'] = False
-                show_small()
-        if not ch['armed'] and val < ch['releaseThreshold']:
-            ch['armed'] = True
+        # Čtení všech aktivních kanálů z MCP3208 v jednom průchodu
+        values = scanner.scan()
+        now = time.monotonic_ns()
+
+        # Detekce úderu s debounce a threshold na všech kanálech
+        for c in scanner.channels:
+            val = values[c]
+            ch = preset[currentPreset][c]
+            if ch['armed'] and val > ch['hitThreshold']:
+                if (now - ch['last_hit_time']) / 1000000 > ch['debounce']:
+                    ch['hitCount'] += 1
+                    ch['barCount'] += 1
+                    ch['velocity'] = int((val / 4095) * 100)
+                    ch['last_hit_time'] = now
+                    ch['armed'] = False
+                    if c == currentChannel:
+                        show_small()
+            if not ch['armed'] and val < ch['releaseThreshold']:
+                ch['armed'] = True
 
         # --- Tlačítka ---
         if GPIO.input(BUTTON_UP) == GPIO.LOW:
@@ -167,6 +172,7 @@ try:
             show_small(); show_big(); time.sleep(0.2)
         if GPIO.input(BUTTON_NEXT_PRESET) == GPIO.LOW:
             currentPreset = (currentPreset + 1) % NUM_PRESETS
+            update_scan_channels()
             show_small(); show_big(); time.sleep(0.2)
         if GPIO.input(BUTTON_RESET) == GPIO.LOW:
             for p in range(NUM_PRESETS):
@@ -0,0 +1,168 @@
+import argparse
+import json
+import math
+import os
+import random
+import sys
+
+from hal import load_adc_trace
+from hits import HitDetector
+from channels import ChannelConfig
+
+NUM_CHANNELS = 8
+MATCH_WINDOW = 0.03   # s, detekce dál od skutečného úderu se nepárují
+RETRIGGER_WINDOW = 0.15   # s, další detekce po úderu (doznívání, odraz) = dvojitý úder
+
+# --- Benchmark detekce úderů nad nahranými průběhy s anotacemi ---
+# Anotace (JSON): {"rate": 2000, "frames": "trace.txt" nebo "zaznam.zvt",
+#                  "hits": [[kanál, index_skenu, velocity], ...]}
+# Bez anotací se použije syntetický průběh se známými údery.
+
+def load_labels(path):
+    with open(path, "r") as f:
+        labels = json.load(f)
+    frames_path = labels["frames"]
+    if not os.path.isabs(frames_path):
+        frames_path = os.path.join(os.path.dirname(path), frames_path)
+    return labels["rate"], load_adc_trace(frames_path), [tuple(h) for h in labels["hits"]]
+
+# Syntetické údery: náběh, špička, doznívání s kmitáním, šum a občas odraz
+def synth_trace(seconds=20, rate=2000, seed=1):
+    rnd = random.Random(seed)
+    n = int(seconds * rate)
+    frames = [[0] * NUM_CHANNELS for _ in range(n)]
+    hits = []
+    for c in range(NUM_CHANNELS):
+        noise = rnd.randint(5, 25)
+        for i in range(n):
+            frames[i][c] = rnd.randint(0, noise)
+        t = rnd.randint(0, rate // 4)
+        while t < n - rate // 5:
+            peak = rnd.randint(300, 4000)
+            rise = max(1, int(rnd.uniform(0.0005, 0.002) * rate))
+            decay = rnd.uniform(0.005, 0.02) * rate
+            rebound = rnd.random() < 0.2
+            for k in range(int(decay * 6)):
+                if t + k >= n:
+                    break
+                if k < rise:
+                    v = peak * (k + 1) / rise
+                else:
+                    d = k - rise
+                    v = peak * math.exp(-d / decay) * abs(math.cos(d / (decay / 3)))
+                    if rebound and d > decay:
+                        v += peak * 0.3 * math.exp(-(d - decay) / (decay / 2))
+                frames[t + k][c] = min(4095, frames[t + k][c] + int(v))
+            hits.append((c, t, int(peak / 4095 * 100)))
+            t += rnd.randint(int(0.06 * rate), int(0.4 * rate))
+    hits.sort(key=lambda h: h[1])
+    return rate, frames, hits
+
+def percentile(values, p):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+def run(rate, frames, truth, settings):
+    detected = []
+    detector = HitDetector(lambda c, peak, t: detected.append((c, t / 1e9, int(peak / 4095 * 100), now[0] / 1e9)),
+                           NUM_CHANNELS)
+    config = ChannelConfig.from_dict(settings)
+    for c in range(NUM_CHANNELS):
+        detector.configure(c, config)
+    now = [0]
+    flat = [v for frame in frames for v in frame]
+    for i in range(len(frames)):
+        now[0] = i * 1000000000 // rate
+        detector.process(flat, i * NUM_CHANNELS, now[0])
+
+    # Párování: každá detekce k poslednímu skutečnému úderu na kanálu před ní.
+    # První detekce do MATCH_WINDOW je úder, každá další do RETRIGGER_WINDOW
+    # (delší než debounce) je dvojitý úder; falešná je jen detekce bez úderu.
+    by_channel = {}
+    for c, idx, vel in sorted(truth, key=lambda h: h[1]):
+        by_channel.setdefault(c, []).append([idx / rate, vel, 0])
+    latencies = []
+    vel_errors = []
+    false_hits = 0
+    double = 0
+    for c, onset, vel, reported in detected:
+        best = None
+        for hit in by_channel.get(c, []):
+            if hit[0] > onset + 1.0 / rate:
+                break
+            best = hit
+        if best is None or onset - best[0] > RETRIGGER_WINDOW:
+            false_hits += 1
+            continue
+        if best[2] or onset - best[0] > MATCH_WINDOW:
+            double += 1
+            continue
+        best[2] = 1
+        latencies.append(round((reported - best[0]) * 1000, 3))
+        vel_errors.append(abs(vel - best[1]))
+    missed = sum(1 for hits in by_channel.values() for h in hits if h[2] == 0)
+    return {
+        "hits": len(truth),
+        "detected": len(detected),
+        "matched": len(latencies),
+        "missed": missed,
+        "double_triggers": double,
+        "false_triggers": false_hits,
+        "latency_ms": {
+            "p50": percentile(latencies, 50),
+            "p99": percentile(latencies, 99),
+            "max": max(latencies) if latencies else None,
+        },
+        "velocity_error": {
+            "mean": round(sum(vel_errors) / len(vel_errors), 3) if vel_errors else None,
+            "p99": percentile(vel_errors, 99),
+            "max": max(vel_errors) if vel_errors else None,
+        },
+    }
+
+# Porovnání s předchozím během: vypíše změněné hodnoty
+def compare(result, baseline, prefix=""):
+    for key, value in result.items():
+        old = baseline.get(key)
+        if isinstance(value, dict):
+            compare(value, old or {}, prefix + key + ".")
+        elif old != value:
+            print(f"{prefix}{key}: {old} -> {value}", file=sys.stderr)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark detekce úderů")
+    parser.add_argument("labels", nargs="?", help="JSON s anotacemi (jinak syntetický průběh)")
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--hit-threshold", type=int, default=60)
+    parser.add_argument("--release-threshold", type=int, default=59)
+    parser.add_argument("--debounce", type=int, default=50, help="ms")
+    parser.add_argument("--scan-window", type=float, default=2, help="ms")
+    parser.add_argument("--out", help="uložit výsledek do JSON")
+    parser.add_argument("--baseline", help="JSON z předchozího běhu pro porovnání")
+    args = parser.parse_args()
+
+    if args.labels:
+        rate, frames, truth = load_labels(args.labels)
+        source = args.labels
+    else:
+        rate, frames, truth = synth_trace(args.seconds, seed=args.seed)
+        source = f"synth:{args.seconds}s:seed{args.seed}"
+    settings = {
+        'hitThreshold': args.hit_threshold,
+        'releaseThreshold': args.release_threshold,
+        'debounce': args.debounce,
+        'scanWindow': args.scan_window,
+    }
+    result = {"trace": source, "rate": rate, "settings": settings}
+    result.update(run(rate, frames, truth, settings))
+    text = json.dumps(result, indent=2)
+    print(text)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            compare(result, json.load(f))
@@ -0,0 +1,89 @@
+import queue
+import time
+
+PRESS = "press"
+REPEAT = "repeat"
+RELEASE = "release"
+
+# Auto-repeat při držení: (od kolika sekund držení, interval, násobek kroku)
+REPEAT_DELAY = 0.4
+REPEAT_STEPS = [
+    (0.0, 0.15, 1),
+    (1.5, 0.06, 1),
+    (3.0, 0.04, 10),
+    (5.0, 0.04, 100),
+]
+
+# --- Tlačítka přes přerušení (GPIO event detect) ---
+# Hrany z RPi.GPIO jdou do fronty, poll() je neblokující stavový automat,
+# který vrací události (pin, PRESS/REPEAT/RELEASE, násobek kroku).
+class ButtonInput:
+    def __init__(self, gpio, pins, repeat_pins=(), debounce=0.02):
+        self.gpio = gpio
+        self.pins = list(pins)
+        self.repeat_pins = set(repeat_pins)
+        self.debounce = debounce
+        self.edges = queue.SimpleQueue()
+        self.pressed = {}       # pin -> čas stisku
+        self.changed = {}       # pin -> čas poslední změny stavu
+        self.next_repeat = {}
+        self.polling = False
+        for pin in self.pins:
+            self.changed[pin] = 0.0
+            try:
+                gpio.add_event_detect(pin, gpio.BOTH, callback=self._edge)
+            except RuntimeError as e:
+                # Jádro bez edge detekce -> čtení úrovní v poll()
+                print("Edge detekce nedostupná, tlačítka se čtou v poll():", e)
+                self.polling = True
+
+    def _edge(self, pin):
+        # Vlákno RPi.GPIO: jen zaznamenat úroveň a čas
+        self.edges.put((pin, self.gpio.input(pin) == self.gpio.LOW, time.monotonic()))
+
+    def _set_state(self, pin, down, t, events):
+        if down == (pin in self.pressed):
+            return
+        if t - self.changed[pin] < self.debounce:
+            return
+        self.changed[pin] = t
+        if down:
+            self.pressed[pin] = t
+            self.next_repeat[pin] = t + REPEAT_DELAY
+            events.append((pin, PRESS, 1))
+        else:
+            del self.pressed[pin]
+            events.append((pin, RELEASE, 1))
+
+    def poll(self, now=None):
+        if now is None:
+            now = time.monotonic()
+        events = []
+        gpio = self.gpio
+        while not self.edges.empty():
+            pin, down, t = self.edges.get()
+            self._set_state(pin, down, t, events)
+        if self.polling:
+            for pin in self.pins:
+                self._set_state(pin, gpio.input(pin) == gpio.LOW, now, events)
+        for pin in list(self.pressed):
+            # Hrana uvolnění mohla padnout do debounce okna -> ověřit úroveň
+            if now - self.changed[pin] >= self.debounce and gpio.input(pin) != gpio.LOW:
+                self._set_state(pin, False, now, events)
+                continue
+            if pin in self.repeat_pins and now >= self.next_repeat[pin]:
+                held = now - self.pressed[pin]
+                interval, mult = REPEAT_STEPS[0][1:]
+                for start, i, m in REPEAT_STEPS:
+                    if held >= start + REPEAT_DELAY:
+                        interval, mult = i, m
+                self.next_repeat[pin] = now + interval
+                events.append((pin, REPEAT, mult))
+        return events
+
+    def close(self):
+        for pin in self.pins:
+            try:
+                self.gpio.remove_event_detect(pin)
+            except Exception:
+                pass
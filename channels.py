@@ -0,0 +1,116 @@
+from array import array
+
+ADC_MAX = 4095       # 12bitový MCP3208
+PLAY_OPTIONS = 64    # volby playEvery/playPosition/random (b4: 1, 1.5, ..., 32.5)
+
+# --- Nastavení kanálu (ukládá se) ---
+# Pořadí polí je zároveň pořadí v uložených datech
+CONFIG_FIELDS = (
+    'active', 'sound', 'playFix', 'playEvery', 'playPosition', 'randomFrom', 'randomTo',
+    'channelVolume', 'hitThreshold', 'releaseThreshold', 'debounce', 'scanWindow',
+    'velocityCurve', 'sensitivity', 'curvePoints',
+)
+CONFIG_DEFAULTS = {
+    'active': True,
+    'sound': 'Empty',
+    'playFix': True,
+    'playEvery': 0,
+    'playPosition': 0,
+    'randomFrom': 0,
+    'randomTo': 1,
+    'channelVolume': 10,
+    'hitThreshold': 60,
+    'releaseThreshold': 59,
+    'debounce': 50,
+    'scanWindow': 2,
+    'velocityCurve': 'lin',
+    'sensitivity': 100,
+    'curvePoints': [],
+}
+
+# Rozsahy číselných polí, stejné meze jako editor v b4
+CONFIG_LIMITS = {
+    'playEvery': (0, PLAY_OPTIONS - 1),
+    'playPosition': (0, PLAY_OPTIONS - 1),
+    'randomFrom': (0, PLAY_OPTIONS - 1),
+    'randomTo': (0, PLAY_OPTIONS - 1),
+    'channelVolume': (1, 10),
+    'hitThreshold': (0, ADC_MAX),
+    'releaseThreshold': (0, ADC_MAX),
+    'debounce': (0, 9999),
+    'scanWindow': (0, 65),      # ms
+    'sensitivity': (1, 1000),   # %
+}
+
+class ChannelConfig:
+    __slots__ = CONFIG_FIELDS
+
+    def __init__(self, **values):
+        for field in CONFIG_FIELDS:
+            setattr(self, field, values.get(field, CONFIG_DEFAULTS[field]))
+        self.curvePoints = [list(p) for p in self.curvePoints]
+
+    # Běhové klíče starých presetů (velocity, armed...) se ignorují
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{k: v for k, v in data.items() if k in CONFIG_DEFAULTS})
+
+    # Hodnoty v pořadí CONFIG_FIELDS (binární banka), bez mezilehlého slovníku
+    @classmethod
+    def from_values(cls, values):
+        config = cls.__new__(cls)
+        for field, value in zip(CONFIG_FIELDS, values):
+            setattr(config, field, value)
+        return config
+
+    def to_dict(self):
+        data = {field: getattr(self, field) for field in CONFIG_FIELDS}
+        data['curvePoints'] = [list(p) for p in self.curvePoints]
+        return data
+
+def new_bank(presets, channels, sound='Empty'):
+    return [[ChannelConfig(sound=sound) for _ in range(channels)] for _ in range(presets)]
+
+def bank_to_data(bank):
+    return [[ch.to_dict() for ch in channels] for channels in bank]
+
+def bank_from_data(data, presets, channels, sound='Empty'):
+    return fit_bank([[ChannelConfig.from_dict(ch) for ch in chans[:channels]] for chans in data[:presets]],
+                    presets, channels, sound)
+
+# Načtené presety do pevného rozměru; chybějící kanály a presety jsou výchozí
+def fit_bank(configs, presets, channels, sound='Empty'):
+    bank = new_bank(presets, channels, sound)
+    for p, chans in enumerate(configs[:presets]):
+        for c, config in enumerate(chans[:channels]):
+            bank[p][c] = config
+    return bank
+
+# --- Běhový stav (neukládá se) ---
+# Souvislá pole pro všechny presety a kanály, index = preset * kanálů + kanál
+class RuntimeTable:
+    def __init__(self, presets, channels):
+        self.presets = presets
+        self.channels = channels
+        n = presets * channels
+        self.velocity = array('H', bytes(2 * n))
+        self.hitCount = array('L', [0] * n)
+        self.barCount = array('L', [0] * n)
+        self.lastHit = array('q', bytes(8 * n))    # monotónní ns
+
+    def index(self, p, c):
+        return p * self.channels + c
+
+    def hit(self, p, c, velocity, stamp):
+        i = p * self.channels + c
+        self.hitCount[i] += 1
+        self.barCount[i] += 1
+        self.velocity[i] = velocity
+        self.lastHit[i] = stamp
+        return i
+
+    def reset(self):
+        for i in range(self.presets * self.channels):
+            self.hitCount[i] = 0
+            self.barCount[i] = 0
+            self.velocity[i] = 0
@@ -0,0 +1,109 @@
+import json
+import os
+from array import array
+
+from hits import MS, NEVER
+
+CROSSTALK_FILE = "crosstalk.json"
+CROSSTALK_WINDOW = 10    # ms po úderu, kdy sousední kanály potlačuje
+LEARN_MARGIN = 1.25      # naučený poměr se o tolik zvětší
+
+# --- Potlačení přeslechů mezi pady ---
+# ratio[i * n + j] = jaká část špičky úderu na kanálu i se objeví na kanálu j.
+# Po potvrzeném úderu na i dostane každý kanál j na CROSSTALK_WINDOW ms
+# hladinu ratio * špička; slabší úder na j v tom okně se zahodí. Kanály,
+# které právě hledají špičku, se porovnávají průběžnou špičkou. Při skenu
+# se nic nepočítá, matice se prochází jen při potvrzeném úderu.
+class CrosstalkSuppressor:
+    def __init__(self, channels=8, window=CROSSTALK_WINDOW):
+        self.n = channels
+        self.window = window * MS
+        self.ratio = array('d', bytes(8 * channels * channels))
+        self.level = array('d', bytes(8 * channels))
+        self.until = array('q', [NEVER] * channels)
+        self.rejected = array('L', [0] * channels)
+        # Učení: zdrojový úder a maxima ostatních kanálů kolem něj
+        self.learning = False
+        self.source = -1
+        self.source_peak = 0
+        self.learn_until = 0
+        self.recent = array('H', bytes(2 * channels))
+        self.recent_time = array('q', bytes(8 * channels))
+        self.learn_max = array('H', bytes(2 * channels))
+
+    def set_ratios(self, ratios):
+        n = self.n
+        for i, row in enumerate(ratios[:n]):
+            for j, r in enumerate(row[:n]):
+                self.ratio[i * n + j] = 0.0 if i == j else r
+
+    def ratios(self):
+        n = self.n
+        return [[round(self.ratio[i * n + j], 4) for j in range(n)] for i in range(n)]
+
+    # Voláno detektorem při konci okna špičky; False = přeslech, zahodit
+    def accept(self, c, peak, now, detector):
+        n = self.n
+        ratio = self.ratio
+        level = self.level[c] if now < self.until[c] else 0.0
+        for i in detector.channels:
+            if detector.scanning[i]:
+                s = ratio[i * n + c] * detector.peak[i]
+                if s > level:
+                    level = s
+        if peak < level:
+            self.rejected[c] += 1
+            return False
+        row = c * n
+        end = now + self.window
+        for j in range(n):
+            s = ratio[row + j] * peak
+            if s > 0 and (now >= self.until[j] or s > self.level[j]):
+                self.level[j] = s
+                self.until[j] = end
+        if self.learning and self.source < 0:
+            self.source = c
+            self.source_peak = peak
+            self.learn_until = end
+            for j in range(n):
+                self.learn_max[j] = self.recent[j]
+        return True
+
+    # Při učení volat pro každý sken (pady udeřit postupně jeden po druhém)
+    def observe(self, samples, base, now):
+        n = self.n
+        window = self.window
+        for j in range(n):
+            v = samples[base + j]
+            if v >= self.recent[j] or now - self.recent_time[j] > window:
+                self.recent[j] = v
+                self.recent_time[j] = now
+            if self.source >= 0 and v > self.learn_max[j]:
+                self.learn_max[j] = v
+        if self.source >= 0 and now >= self.learn_until:
+            c = self.source
+            for j in range(n):
+                if j != c and self.source_peak:
+                    r = min(self.learn_max[j] / self.source_peak * LEARN_MARGIN, 1.0)
+                    if r > self.ratio[c * n + j]:
+                        self.ratio[c * n + j] = r
+            self.source = -1
+
+    def load(self, path=CROSSTALK_FILE):
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            print("Přeslechy nejde načíst:", e)
+            return False
+        self.window = int(data.get("window", CROSSTALK_WINDOW) * MS)
+        self.set_ratios(data.get("ratios", []))
+        return True
+
+    def save(self, path=CROSSTALK_FILE):
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"window": self.window / MS, "ratios": self.ratios()}, f, indent=1)
+        os.replace(tmp, path)
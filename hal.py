@@ -0,0 +1,272 @@
+import threading
+import time
+
+from adctrace import TraceReader, is_trace
+
+# --- Hardwarová vrstva ---
+# Backend dává objekty se stejným rozhraním jako spidev.SpiDev, modul
+# RPi.GPIO a RPLCD CharLCD. "pi" je skutečný hardware (knihovny se importují
+# až tady), "sim" běží na libovolném Linuxu: ADC přehrává průběhy ze souboru,
+# tlačítka podle scénáře a výstup LCD se zachytává i s počtem bajtů.
+
+class PiBackend:
+    name = "pi"
+
+    def __init__(self):
+        import RPi.GPIO
+        self.gpio = RPi.GPIO
+
+    def open_spi(self, bus, device, speed_hz):
+        import spidev
+        spi = spidev.SpiDev()
+        spi.open(bus, device)
+        spi.max_speed_hz = speed_hz
+        return spi
+
+    def open_lcd(self, address, cols, rows):
+        from RPLCD.i2c import CharLCD
+        return CharLCD('PCF8574', address, cols=cols, rows=rows)
+
+    def start(self):
+        pass
+
+    def report(self):
+        return ""
+
+# --- Simulované ADC (MCP3208 přes SPI) ---
+# Soubor s průběhy: binární záznam z adctrace.py, nebo text - jeden řádek =
+# jeden sken, až 8 hodnot 0-4095 oddělených čárkou nebo mezerou, '#' je
+# komentář. Bez souboru je na vstupech klid (0).
+def load_adc_trace(path):
+    if is_trace(path):
+        reader = TraceReader(path)
+        frames = [(values + [0] * 8)[:8] for values in reader.frames()]
+        reader.close()
+        return frames
+    frames = []
+    with open(path, "r") as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+            values = [int(v) for v in line.replace(",", " ").split()]
+            frames.append((values + [0] * 8)[:8])
+    return frames
+
+class SimSpi:
+    # realtime=False: každý sken = další řádek (profilování na plný výkon),
+    # realtime=True: řádek podle uplynulého času a frekvence rate
+    def __init__(self, frames=None, realtime=False, rate=2000, loop=True):
+        self.frames = frames or [[0] * 8]
+        self.realtime = realtime
+        self.rate = rate
+        self.loop = loop
+        self.max_speed_hz = 0
+        self.index = -1         # první sken přičte 1 -> řádek 0
+        self.last_channel = 8
+        self.transfers = 0
+        self.t0 = time.monotonic()
+
+    def _frame(self, channel):
+        if self.realtime:
+            i = int((time.monotonic() - self.t0) * self.rate)
+        else:
+            # Nový sken začíná, když kanál nejde po předchozím
+            if channel <= self.last_channel:
+                self.index += 1
+            self.last_channel = channel
+            i = self.index
+        if i >= len(self.frames):
+            i = i % len(self.frames) if self.loop else len(self.frames) - 1
+        return self.frames[i]
+
+    def xfer2(self, data):
+        channel = ((data[0] & 1) << 2) | (data[1] >> 6)
+        value = self._frame(channel)[channel]
+        self.transfers += 1
+        return [0, (value >> 8) & 15, value & 255]
+
+    def close(self):
+        pass
+
+# --- Simulované GPIO (rozhraní modulu RPi.GPIO) ---
+class SimGPIO:
+    BCM = 11
+    BOARD = 10
+    IN = 1
+    OUT = 0
+    PUD_UP = 22
+    PUD_DOWN = 21
+    LOW = 0
+    HIGH = 1
+    RISING = 31
+    FALLING = 32
+    BOTH = 33
+
+    def __init__(self):
+        self.levels = {}
+        self.callbacks = {}
+        self.lock = threading.Lock()
+
+    def setmode(self, mode):
+        pass
+
+    def setup(self, pin, direction, pull_up_down=None):
+        self.levels[pin] = self.HIGH if pull_up_down == self.PUD_UP else self.LOW
+
+    def input(self, pin):
+        return self.levels.get(pin, self.HIGH)
+
+    def add_event_detect(self, pin, edge, callback=None, bouncetime=None):
+        self.callbacks[pin] = (edge, callback)
+
+    def remove_event_detect(self, pin):
+        self.callbacks.pop(pin, None)
+
+    def cleanup(self):
+        self.callbacks.clear()
+
+    # Stisk tlačítka = stažení pinu k zemi
+    def set_level(self, pin, level):
+        with self.lock:
+            old = self.levels.get(pin, self.HIGH)
+            self.levels[pin] = level
+        edge, callback = self.callbacks.get(pin, (None, None))
+        if callback is None or old == level:
+            return
+        if edge == self.BOTH or (edge == self.FALLING and level == self.LOW) \
+                or (edge == self.RISING and level == self.HIGH):
+            callback(pin)
+
+    def press(self, pin):
+        self.set_level(pin, self.LOW)
+
+    def release(self, pin):
+        self.set_level(pin, self.HIGH)
+
+# Scénář tlačítek: řádky "čas_s pin press|release|tap", '#' je komentář
+def load_button_script(path):
+    events = []
+    with open(path, "r") as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+            t, pin, action = line.split()
+            events.append((float(t), int(pin), action))
+    events.sort()
+    return events
+
+class ButtonScript(threading.Thread):
+    def __init__(self, gpio, events, tap_time=0.05):
+        super().__init__(name="sim-buttons", daemon=True)
+        self.gpio = gpio
+        self.events = events
+        self.tap_time = tap_time
+
+    def run(self):
+        t0 = time.monotonic()
+        for t, pin, action in self.events:
+            delay = t0 + t - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            if action == "press":
+                self.gpio.press(pin)
+            elif action == "release":
+                self.gpio.release(pin)
+            else:
+                self.gpio.press(pin)
+                time.sleep(self.tap_time)
+                self.gpio.release(pin)
+
+# --- Simulovaný LCD (rozhraní RPLCD CharLCD) ---
+class SimLCD:
+    def __init__(self, address, cols, rows):
+        self.address = address
+        self.cols = cols
+        self.rows = rows
+        self.grid = [[" "] * cols for _ in range(rows)]
+        self._pos = (0, 0)
+        self._mode = 'hide'
+        self.chars = 0
+        self.commands = 0
+
+    # HD44780 přes PCF8574 ve 4bit režimu: 1 bajt = 2 nibbly po 3 I2C zápisech
+    @property
+    def i2c_bytes(self):
+        return (self.chars + self.commands) * 6
+
+    @property
+    def cursor_pos(self):
+        return self._pos
+
+    @cursor_pos.setter
+    def cursor_pos(self, pos):
+        self._pos = pos
+        self.commands += 1
+
+    @property
+    def cursor_mode(self):
+        return self._mode
+
+    @cursor_mode.setter
+    def cursor_mode(self, mode):
+        self._mode = mode
+        self.commands += 1
+
+    def write_string(self, text):
+        row, col = self._pos
+        for char in text:
+            if col >= self.cols:
+                row, col = (row + 1) % self.rows, 0
+            self.grid[row][col] = char
+            col += 1
+            self.chars += 1
+        self._pos = (row, col)
+
+    def clear(self):
+        self.grid = [[" "] * self.cols for _ in range(self.rows)]
+        self._pos = (0, 0)
+        self.commands += 1
+
+    def text(self):
+        return "\n".join("".join(line) for line in self.grid)
+
+class SimBackend:
+    name = "sim"
+
+    def __init__(self, adc_file=None, button_file=None, realtime=False):
+        self.gpio = SimGPIO()
+        self.adc_frames = load_adc_trace(adc_file) if adc_file else None
+        self.realtime = realtime
+        self.button_events = load_button_script(button_file) if button_file else []
+        self.spi = None
+        self.lcds = []
+
+    def open_spi(self, bus, device, speed_hz):
+        self.spi = SimSpi(self.adc_frames, realtime=self.realtime)
+        self.spi.max_speed_hz = speed_hz
+        return self.spi
+
+    def open_lcd(self, address, cols, rows):
+        lcd = SimLCD(address, cols, rows)
+        self.lcds.append(lcd)
+        return lcd
+
+    def start(self):
+        if self.button_events:
+            ButtonScript(self.gpio, self.button_events).start()
+
+    def report(self):
+        lines = []
+        if self.spi is not None:
+            lines.append(f"SPI transfers: {self.spi.transfers}")
+        for lcd in self.lcds:
+            lines.append(f"LCD 0x{lcd.address:02x}: {lcd.chars} znaků, {lcd.commands} příkazů, ~{lcd.i2c_bytes} B I2C")
+            lines.append(lcd.text())
+        return "\n".join(lines)
+
+def open_backend(name="pi", **kwargs):
+    if name == "sim":
+        return SimBackend(**kwargs)
+    return PiBackend()
@@ -0,0 +1,78 @@
+from array import array
+
+NUM_CHANNELS = 8
+DEFAULT_SCAN_WINDOW = 2  # ms
+MS = 1000000             # ns
+NEVER = -(1 << 62)       # razítko "ještě nikdy"
+
+# --- Detekce úderů se zachycením špičky ---
+# Po překročení hitThreshold se kanál ještě scanWindow ms dívá po maximu,
+# teprve pak ohlásí úder se skutečnou špičkou. Stav i nastavení všech
+# kanálů jsou v polích indexovaných číslem kanálu. Volitelný crosstalk
+# (crosstalk.py) může úder před ohlášením zahodit jako přeslech,
+# on_release(c, now) se volá při znovuodjištění kanálu (konec úderu).
+class HitDetector:
+    def __init__(self, on_hit, channels=NUM_CHANNELS, crosstalk=None, on_release=None):
+        self.on_hit = on_hit
+        self.crosstalk = crosstalk
+        self.on_release = on_release
+        self.channels = range(channels)
+        # Nastavení (časy v ns, stejně jako razítka skenů)
+        self.hit_threshold = array('H', [60] * channels)
+        self.release_threshold = array('H', [59] * channels)
+        self.debounce = array('q', [50 * MS] * channels)
+        self.window = array('q', [DEFAULT_SCAN_WINDOW * MS] * channels)
+        # Běhový stav
+        self.armed = array('b', [1] * channels)
+        self.scanning = array('b', [0] * channels)
+        self.peak = array('H', [0] * channels)
+        self.hit_time = array('q', [0] * channels)
+        self.window_end = array('q', [0] * channels)
+        self.last_hit = array('q', [NEVER] * channels)
+
+    # ch = ChannelConfig (channels.py)
+    def configure(self, c, ch):
+        self.hit_threshold[c] = ch.hitThreshold
+        self.release_threshold[c] = ch.releaseThreshold
+        self.debounce[c] = int(ch.debounce * MS)
+        self.window[c] = int(ch.scanWindow * MS)
+
+    def load_preset(self, channels):
+        for c, ch in enumerate(channels):
+            self.configure(c, ch)
+
+    def reset(self):
+        for c in self.channels:
+            self.armed[c] = 1
+            self.scanning[c] = 0
+            self.peak[c] = 0
+
+    def process(self, samples, base, now, channels=None):
+        armed = self.armed
+        scanning = self.scanning
+        peak = self.peak
+        for c in (self.channels if channels is None else channels):
+            v = samples[base + c]
+            if scanning[c]:
+                if v > peak[c]:
+                    peak[c] = v
+                if now >= self.window_end[c]:
+                    scanning[c] = 0
+                    if self.crosstalk is None or self.crosstalk.accept(c, peak[c], now, self):
+                        self.on_hit(c, peak[c], self.hit_time[c])
+            elif armed[c]:
+                if v > self.hit_threshold[c] and now - self.last_hit[c] > self.debounce[c]:
+                    armed[c] = 0
+                    peak[c] = v
+                    self.hit_time[c] = now
+                    self.last_hit[c] = now
+                    if self.window[c] > 0:
+                        scanning[c] = 1
+                        self.window_end[c] = now + self.window[c]
+                    elif self.crosstalk is None or self.crosstalk.accept(c, v, now, self):
+                        self.on_hit(c, v, now)
+                continue
+            if not armed[c] and not scanning[c] and v < self.release_threshold[c]:
+                armed[c] = 1
+                if self.on_release is not None:
+                    self.on_release(c, now)
@@ -0,0 +1,146 @@
+import os
+import queue
+import selectors
+import socket
+import struct
+import sys
+import threading
+
+HIT_SOCKET = "/tmp/zvuky-hits.sock"
+MAGIC = b"ZVHS"
+VERSION = 1
+HELLO = struct.Struct("<4sHH")          # magic, verze, délka záznamu
+# Záznam úderu: razítko ns, hitCount, kanál, preset, velocity, rezerva
+RECORD = struct.Struct("<qIBBBx")
+BATCH_RECORDS = 64                      # max záznamů v jednom zápisu
+MAX_PENDING = 64 * 1024                 # B neodeslaných dat, pak se odběratel odpojí
+
+# --- Proud úderů přes Unix socket ---
+# Detekce jen vloží n-tici do fronty (nikdy neblokuje). Vlákno vydavatele
+# přijímá odběratele, ze všech čekajících úderů udělá jeden blok a pošle ho
+# každému odběrateli neblokujícím send(). Kdo nestíhá číst a nahromadí víc
+# než MAX_PENDING bajtů, je odpojen a započítán do slow_dropped.
+# Po připojení přijde HELLO (magic, verze, délka záznamu), pak jen záznamy.
+class HitStream(threading.Thread):
+    def __init__(self, path=HIT_SOCKET):
+        super().__init__(name="hit-stream", daemon=True)
+        self.path = path
+        self.events = queue.SimpleQueue()
+        self.running = True
+        self.clients = {}            # socket -> neodeslaná data
+        self.published = 0
+        self.batches = 0
+        self.slow_dropped = 0
+        self.closed = 0
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(path)
+        self.server.listen(8)
+        self.server.setblocking(False)
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.server, selectors.EVENT_READ)
+
+    # Z detekčního vlákna
+    def publish(self, c, preset, velocity, stamp, count):
+        self.events.put((stamp, count, c, preset, velocity))
+
+    def _accept(self):
+        while True:
+            try:
+                sock, _ = self.server.accept()
+            except (BlockingIOError, OSError):
+                return
+            sock.setblocking(False)
+            self.clients[sock] = HELLO.pack(MAGIC, VERSION, RECORD.size)
+
+    def _drop(self, sock, slow=False):
+        self.clients.pop(sock, None)
+        if slow:
+            self.slow_dropped += 1
+        else:
+            self.closed += 1
+        try:
+            sock.close()
+        except OSError:
+            pass
+
+    def _send(self, data=b""):
+        for sock, pending in list(self.clients.items()):
+            buf = pending + data
+            if not buf:
+                continue
+            try:
+                n = sock.send(buf)
+            except BlockingIOError:
+                n = 0
+            except OSError:
+                self._drop(sock)
+                continue
+            rest = buf[n:]
+            if len(rest) > MAX_PENDING:
+                self._drop(sock, slow=True)
+            else:
+                self.clients[sock] = rest
+
+    def run(self):
+        pack = RECORD.pack
+        while self.running:
+            if self.selector.select(timeout=0):
+                self._accept()
+            try:
+                event = self.events.get(timeout=0.05)
+            except queue.Empty:
+                self._send()
+                continue
+            batch = bytearray(pack(*event))
+            n = 1
+            while n < BATCH_RECORDS:
+                try:
+                    batch += pack(*self.events.get_nowait())
+                except queue.Empty:
+                    break
+                n += 1
+            self.published += n
+            self.batches += 1
+            if self.clients:
+                self._send(bytes(batch))
+
+    def stop(self):
+        self.running = False
+        if self.is_alive():
+            self.join()
+        for sock in list(self.clients):
+            sock.close()
+        self.clients.clear()
+        self.selector.close()
+        self.server.close()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+    def stats(self):
+        return (f"Proud úderů: {self.published} úderů v {self.batches} blocích, "
+                f"odběratelů {len(self.clients)}, odpojeno pomalých {self.slow_dropped}")
+
+# --- Odběratel pro ladění: python hitstream.py [socket] ---
+if __name__ == "__main__":
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.connect(sys.argv[1] if len(sys.argv) > 1 else HIT_SOCKET)
+    f = sock.makefile("rb")
+    magic, version, size = HELLO.unpack(f.read(HELLO.size))
+    if magic != MAGIC or version != VERSION or size != RECORD.size:
+        print("Neznámý proud:", magic, version, size)
+        sys.exit(1)
+    try:
+        while True:
+            rec = f.read(size)
+            if len(rec) < size:
+                break
+            stamp, count, c, preset, velocity = RECORD.unpack(rec)
+            print(f"{stamp / 1e9:.6f} PR {preset + 1:02d} CH {c + 1:02d} vel {velocity:3d} #{count}")
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,181 @@
+import threading
+import time
+
+# --- Framebuffer pro CharLCD ---
+# Obal kolem RPLCD CharLCD se stejným rozhraním (cursor_pos, write_string,
+# cursor_mode). Zápisy jdou jen do paměti, flush() snímek zveřejní a ten se
+# porovná s tím, co je na displeji - přes I2C jdou jen změněné úseky.
+# S připojeným LcdWriterem se na displej zapisuje na pozadí.
+
+# Nezměněné znaky mezi dvěma změnami se raději přepíšou, pokud jich je
+# nejvýš tolik, kolik stojí přesun kurzoru (jeden příkaz)
+MERGE_GAP = 1
+
+class FrameBuffer:
+    def __init__(self, lcd, rows, cols, max_fps=20):
+        self.lcd = lcd
+        self.rows = rows
+        self.cols = cols
+        self.max_fps = max_fps
+        self.frame = [[" "] * cols for _ in range(rows)]
+        self.glass = [[" "] * cols for _ in range(rows)]
+        self._pos = (0, 0)
+        self._mode = 'hide'
+        # Poslední zveřejněný snímek (frame, pozice a režim kurzoru)
+        self._lock = threading.Lock()
+        self._pending = None
+        self.writer = None
+        self.last_write = 0.0
+        self.frames_submitted = 0
+        self.frames_written = 0
+        self._hw_pos = None
+        self._hw_mode = None
+        self.bytes_sent = 0
+        self.commands_sent = 0
+        lcd.clear()
+        self._hw_pos = (0, 0)
+
+    # --- Rozhraní jako CharLCD (jen do paměti) ---
+    @property
+    def cursor_pos(self):
+        return self._pos
+
+    @cursor_pos.setter
+    def cursor_pos(self, pos):
+        self._pos = pos
+
+    @property
+    def cursor_mode(self):
+        return self._mode
+
+    @cursor_mode.setter
+    def cursor_mode(self, mode):
+        self._mode = mode
+
+    def write_string(self, text):
+        row, col = self._pos
+        line = self.frame[row]
+        for char in text[:max(0, self.cols - col)]:
+            line[col] = char
+            col += 1
+        self._pos = (row, col)
+
+    def clear(self):
+        for line in self.frame:
+            for col in range(self.cols):
+                line[col] = " "
+        self._pos = (0, 0)
+
+    # --- Odeslání rozdílu na displej ---
+    def dirty_runs(self, frame, row):
+        frame = frame[row]
+        glass = self.glass[row]
+        runs = []
+        start = end = None
+        for col in range(self.cols):
+            if frame[col] != glass[col]:
+                if start is not None and col - end <= MERGE_GAP:
+                    end = col + 1
+                else:
+                    if start is not None:
+                        runs.append((start, end))
+                    start, end = col, col + 1
+        if start is not None:
+            runs.append((start, end))
+        return runs
+
+    # Zveřejní aktuální snímek; bez writeru ho rovnou zapíše
+    def flush(self):
+        snapshot = ([line[:] for line in self.frame], self._pos, self._mode)
+        with self._lock:
+            self._pending = snapshot
+            self.frames_submitted += 1
+        if self.writer is None:
+            return self.write_pending()
+        self.writer.wake()
+        return True
+
+    @property
+    def dirty(self):
+        return self._pending is not None
+
+    # Zapíše poslední zveřejněný snímek, starší se tím zahodí
+    def write_pending(self):
+        with self._lock:
+            pending = self._pending
+            self._pending = None
+        if pending is None:
+            return False
+        frame, pos, mode = pending
+        lcd = self.lcd
+        changed = False
+        for row in range(self.rows):
+            line = frame[row]
+            glass = self.glass[row]
+            for start, end in self.dirty_runs(frame, row):
+                if self._hw_pos != (row, start):
+                    lcd.cursor_pos = (row, start)
+                    self.commands_sent += 1
+                lcd.write_string("".join(line[start:end]))
+                glass[start:end] = line[start:end]
+                self.bytes_sent += end - start
+                # Za koncem řádku RPLCD kurzor zalamuje, pozici pak neznáme
+                self._hw_pos = (row, end) if end < self.cols else None
+                changed = True
+        if self._hw_mode != mode:
+            lcd.cursor_mode = mode
+            self._hw_mode = mode
+            self.commands_sent += 1
+        # Viditelný kurzor vrátit na požadované místo
+        if mode != 'hide' and (changed or self._hw_pos != pos):
+            lcd.cursor_pos = pos
+            self._hw_pos = pos
+            self.commands_sent += 1
+        self.last_write = time.monotonic()
+        self.frames_written += 1
+        return changed
+
+# --- Zápis na displeje na pozadí ---
+# Vždy zapíše jen nejnovější snímek a každý displej nejvýš max_fps krát za
+# sekundu, mezisnímky při rychlých úderech se zahodí.
+class LcdWriter(threading.Thread):
+    def __init__(self, displays):
+        super().__init__(name="lcd-writer", daemon=True)
+        self.displays = list(displays)
+        self.running = True
+        self._cond = threading.Condition()
+        for fb in self.displays:
+            fb.writer = self
+
+    def wake(self):
+        with self._cond:
+            self._cond.notify()
+
+    def run(self):
+        while self.running:
+            now = time.monotonic()
+            timeout = None
+            for fb in self.displays:
+                if not fb.dirty:
+                    continue
+                due = fb.last_write + 1.0 / fb.max_fps
+                if now >= due:
+                    try:
+                        fb.write_pending()
+                    except OSError as e:
+                        print("Chyba zápisu na LCD:", e)
+                else:
+                    wait = due - now
+                    timeout = wait if timeout is None else min(timeout, wait)
+            with self._cond:
+                if not any(fb.dirty for fb in self.displays) or timeout is not None:
+                    self._cond.wait(timeout)
+
+    def stop(self):
+        self.running = False
+        self.wake()
+        self.join()
+        # Dopsat poslední snímky synchronně
+        for fb in self.displays:
+            fb.writer = None
+            fb.write_pending()
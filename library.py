@@ -0,0 +1,111 @@
+import json
+import os
+import threading
+
+from samplecache import read_wav_header
+
+INDEX_FILE = "samples_index.json"
+INDEX_VERSION = 1
+
+# --- Index knihovny samplů ---
+# Pamatuje si pro každý WAV velikost, mtime, frekvenci, počet kanálů a délku.
+# Při startu se načte z disku, přeskenování čte hlavičky jen u souborů,
+# kterým se změnila velikost nebo mtime. Jméno -> pozice je slovník, takže
+# další/předchozí sample je O(1).
+class SampleLibrary:
+    def __init__(self, path, index_file=INDEX_FILE):
+        self.path = path
+        self.index_file = index_file
+        self.info = {}
+        self.names = ["Empty"]
+        self.position = {"Empty": 0}
+        self.error = False
+        self.lock = threading.Lock()
+        self.load_index()
+
+    def load_index(self):
+        try:
+            with open(self.index_file, "r") as f:
+                data = json.load(f)
+            if data.get("version") == INDEX_VERSION and data.get("path") == self.path:
+                self._publish(data["samples"])
+        except Exception:
+            pass
+
+    def save_index(self):
+        tmp = self.index_file + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"version": INDEX_VERSION, "path": self.path, "samples": self.info}, f)
+        os.replace(tmp, self.index_file)
+
+    # Nový seznam se sestaví bokem a vymění naráz
+    def _publish(self, info):
+        names = ["Empty"] + sorted(info, key=str.lower) if info else ["Card Error!"]
+        position = {name: i for i, name in enumerate(names)}
+        with self.lock:
+            self.info = info
+            self.names = names
+            self.position = position
+
+    def rescan(self):
+        old = self.info
+        info = {}
+        changed = False
+        try:
+            entries = list(os.scandir(self.path))
+        except OSError as e:
+            print("Chyba při čtení složky:", e)
+            self.error = True
+            self._publish({})
+            return False
+        for entry in entries:
+            fname = entry.name
+            # Ignoruj skryté soubory a ty s prefixem ._
+            if fname.startswith('.') or not fname.lower().endswith(".wav"):
+                continue
+            name = fname[:-4]
+            st = entry.stat()
+            rec = old.get(name)
+            if rec is not None and rec["size"] == st.st_size and rec["mtime"] == st.st_mtime_ns:
+                info[name] = rec
+                continue
+            changed = True
+            rec = {"size": st.st_size, "mtime": st.st_mtime_ns, "rate": 0, "channels": 0, "frames": 0}
+            try:
+                with open(entry.path, "rb") as f:
+                    tag, nch, rate, bits, offset, size = read_wav_header(f)
+                rec["rate"] = rate
+                rec["channels"] = nch
+                rec["frames"] = size // max(1, nch * bits // 8)
+            except Exception as e:
+                print("Vadný WAV:", fname, e)
+            info[name] = rec
+        if changed or len(info) != len(old) or not info:
+            self._publish(info)
+            try:
+                self.save_index()
+            except OSError as e:
+                print("Index samplů nejde uložit:", e)
+        self.error = not info
+        return True
+
+    def rescan_async(self, on_done=None):
+        def run():
+            self.rescan()
+            if on_done is not None:
+                on_done()
+        t = threading.Thread(target=run, name="sample-library", daemon=True)
+        t.start()
+        return t
+
+    def __len__(self):
+        return len(self.names)
+
+    def step(self, name, delta):
+        with self.lock:
+            names = self.names
+            i = self.position.get(name, 0)
+        return names[(i + delta) % len(names)]
+
+    def first(self):
+        return self.names[0]
@@ -0,0 +1,86 @@
+import ctypes
+import fcntl
+import struct
+
+NUM_ADC_CHANNELS = 8
+
+# --- SPI ioctl (linux/spi/spidev.h) ---
+# struct spi_ioc_transfer: tx_buf, rx_buf, len, speed_hz, delay_usecs,
+# bits_per_word, cs_change, tx_nbits, rx_nbits, word_delay_usecs, pad
+_SPI_TRANSFER = struct.Struct("<QQIIHBBBBBB")
+
+def _spi_ioc_message(n):
+    # _IOW('k', 0, char[SPI_MSGSIZE(n)])
+    return (1 << 30) | ((n * _SPI_TRANSFER.size) << 16) | (ord('k') << 8)
+
+# --- Příkaz a dekódování MCP3208 ---
+def channel_command(channel):
+    return [6 | (channel >> 2), (channel & 3) << 6, 0]
+
+def read_channel(spi, channel):
+    adc = spi.xfer2(channel_command(channel))
+    return ((adc[1] & 15) << 8) | adc[2]
+
+def decode_frames(rx, channels, values):
+    # rx = 3 bajty na kanál v pořadí channels, výsledek se zapíše do values[kanál]
+    i = 0
+    for c in channels:
+        values[c] = ((rx[i + 1] & 15) << 8) | rx[i + 2]
+        i += 3
+    return values
+
+# --- Skenování všech aktivních kanálů v jednom SPI průchodu ---
+class MCP3208Scanner:
+    def __init__(self, spi, channels=range(NUM_ADC_CHANNELS), speed_hz=1350000):
+        self.spi = spi
+        self.speed_hz = speed_hz
+        self.values = [0] * NUM_ADC_CHANNELS
+        self.channels = ()
+        self._fd = None
+        try:
+            self._fd = spi.fileno()
+        except Exception:
+            pass
+        self.set_channels(channels)
+
+    def set_channels(self, channels):
+        channels = tuple(channels)
+        if channels == self.channels:
+            return
+        n = len(channels)
+        tx = []
+        for c in channels:
+            tx += channel_command(c)
+        tx_buf = ctypes.create_string_buffer(bytes(tx), max(1, 3 * n))
+        rx_buf = ctypes.create_string_buffer(max(1, 3 * n))
+        # Jedna zpráva s n přenosy po 3 bajtech, CS se mezi nimi uvolní (cs_change)
+        msg = bytearray()
+        tx_addr = ctypes.addressof(tx_buf)
+        rx_addr = ctypes.addressof(rx_buf)
+        for i in range(n):
+            cs_change = 1 if i < n - 1 else 0
+            msg += _SPI_TRANSFER.pack(tx_addr + 3 * i, rx_addr + 3 * i, 3,
+                                      self.speed_hz, 0, 8, cs_change, 0, 0, 0, 0)
+        # Celý plán se vymění jedním přiřazením, scan() z jiného vlákna
+        # tak vždy pracuje s konzistentními buffery
+        self._plan = (channels, tx_buf, rx_buf, bytes(msg), _spi_ioc_message(n))
+        self.channels = channels
+        for c in range(NUM_ADC_CHANNELS):
+            if c not in channels:
+                self.values[c] = 0
+
+    def scan(self):
+        channels, tx_buf, rx_buf, msg, request = self._plan
+        if not channels:
+            return self.values
+        if self._fd is not None:
+            try:
+                fcntl.ioctl(self._fd, request, msg)
+                return decode_frames(rx_buf.raw, channels, self.values)
+            except OSError:
+                # Ovladač/backend ioctl neumí -> po kanálech přes xfer2
+                self._fd = None
+        rx = []
+        for c in channels:
+            rx += self.spi.xfer2(channel_command(c))
+        return decode_frames(rx, channels, self.values)
@@ -0,0 +1,101 @@
+import time
+from array import array
+
+SUB_BITS = 3                       # 8 košů na každé zdvojnásobení
+EXACT = 1 << (SUB_BITS + 1)        # hodnoty pod 16 ns mají vlastní koš
+BUCKETS = (64 - SUB_BITS) << SUB_BITS
+
+# --- Histogram časů (ns) s pevnými koši ---
+# Koše rostou geometricky (8 na oktávu, chyba do 12 %), index se počítá jen
+# bitovými operacemi, takže přidání hodnoty je pár instrukcí bez alokace.
+def bucket(ns):
+    b = ns.bit_length()
+    if b <= SUB_BITS + 1:
+        return ns
+    return ((b - SUB_BITS) << SUB_BITS) + ((ns >> (b - SUB_BITS - 1)) & ((1 << SUB_BITS) - 1))
+
+# Horní hranice koše (ns)
+def bucket_limit(i):
+    if i < EXACT:
+        return i + 1
+    b = (i >> SUB_BITS) + SUB_BITS
+    shift = b - SUB_BITS - 1
+    return (((1 << SUB_BITS) + (i & ((1 << SUB_BITS) - 1))) << shift) + (1 << shift)
+
+class Histogram:
+    def __init__(self, name):
+        self.name = name
+        self.buckets = array('L', [0] * BUCKETS)
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def add(self, ns):
+        self.buckets[bucket(ns)] += 1
+        self.count += 1
+        self.total += ns
+        if ns > self.max:
+            self.max = ns
+
+    def percentile(self, p):
+        if not self.count:
+            return 0
+        limit = self.count * p / 100
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if n and seen >= limit:
+                return min(bucket_limit(i), self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean_us": round(self.total / self.count / 1000, 1) if self.count else None,
+            "p50_us": round(self.percentile(50) / 1000, 1),
+            "p99_us": round(self.percentile(99) / 1000, 1),
+            "max_us": round(self.max / 1000, 1),
+        }
+
+# --- Měření jednotlivých fází smyčky (--metrics) ---
+# Vypnuté měření nestojí nic: wrap()/instrument() pak vrací původní funkci
+# a do hot path se nic nepřidá. Zapnuté obalí funkci měřením času.
+class Metrics:
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.stages = {}
+
+    def stage(self, name):
+        h = self.stages.get(name)
+        if h is None:
+            h = self.stages[name] = Histogram(name)
+        return h
+
+    def wrap(self, name, fn):
+        if not self.enabled:
+            return fn
+        add = self.stage(name).add
+        clock = time.perf_counter_ns
+
+        def timed(*args, **kwargs):
+            t = clock()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                add(clock() - t)
+        return timed
+
+    # Přepíše metodu na instanci (obj.attr) měřenou verzí
+    def instrument(self, obj, attr, name):
+        setattr(obj, attr, self.wrap(name, getattr(obj, attr)))
+
+    # Fáze s nejhorším časem nahoře
+    def worst(self, n=3):
+        return sorted((h for h in self.stages.values() if h.count), key=lambda h: -h.max)[:n]
+
+    def dump(self):
+        lines = [f"{'fáze':<10}{'počet':>9}{'průměr':>10}{'p50':>10}{'p99':>10}{'max':>10}  (µs)"]
+        for name, h in self.stages.items():
+            s = h.summary()
+            lines.append(f"{name:<10}{s['count']:>9}{s['mean_us'] or 0:>10}{s['p50_us']:>10}{s['p99_us']:>10}{s['max_us']:>10}")
+        return "\n".join(lines)
@@ -0,0 +1,167 @@
+import glob
+import json
+import os
+import struct
+import threading
+import time
+from array import array
+
+from metrics import Histogram
+
+MIDI_FILE = "midi.json"
+MIDI_CHANNEL = 9                                  # 10. kanál = bicí (GM)
+MIDI_NOTES = [36, 38, 42, 46, 45, 48, 49, 51]     # kopák, virbl, HH zavř./otevř., tomy, crash, ride
+NOTE_ON = 0x90
+NOTE_OFF = 0x80
+
+# velocity 0-100 -> MIDI 1-127; i úder s velocity 0 je nota (0 by byl note-off)
+def midi_velocity_table():
+    return bytes(max(1, min(127, round(v * 127 / 100))) for v in range(101))
+
+# --- Výstupy: každý zápis hned, bez bufferu ---
+class RawMidiOut:
+    def __init__(self, path):
+        self.name = path
+        self.fd = os.open(path, os.O_WRONLY | os.O_NONBLOCK)
+
+    def write(self, data, stamp):
+        os.write(self.fd, data)
+
+    def close(self):
+        os.close(self.fd)
+
+class VirtualMidiOut:
+    def __init__(self, port_name="Zvuky"):
+        # Import až tady: jinak by se načítal (a hledal ALSA) při každém startu
+        try:
+            import rtmidi
+        except ImportError:
+            raise RuntimeError("python-rtmidi není nainstalované")
+        self.name = f"virtual:{port_name}"
+        self.out = rtmidi.MidiOut()
+        self.out.open_virtual_port(port_name)
+
+    def write(self, data, stamp):
+        self.out.send_message(list(data))
+
+    def close(self):
+        self.out.close_port()
+
+# Standardní MIDI soubor (typ 0) pro testy; čas z razítek úderů,
+# 1 tick = 1 ms (1000 ticků na čtvrťovou, tempo 1 000 000 µs = 60 BPM)
+class FileMidiOut:
+    def __init__(self, path):
+        self.name = path
+        self.path = path
+        self.events = []
+        self.start = None
+
+    def write(self, data, stamp):
+        if self.start is None:
+            self.start = stamp
+        self.events.append(((stamp - self.start) // 1000000, bytes(data)))
+
+    def close(self):
+        track = bytearray(b"\x00\xff\x51\x03\x0f\x42\x40")   # tempo 1 000 000 µs
+        last = 0
+        for tick, data in sorted(self.events, key=lambda e: e[0]):
+            track += _varlen(tick - last) + data
+            last = tick
+        track += b"\x00\xff\x2f\x00"
+        with open(self.path, "wb") as f:
+            f.write(b"MThd" + struct.pack(">IHHH", 6, 0, 1, 1000))
+            f.write(b"MTrk" + struct.pack(">I", len(track)) + track)
+
+def _varlen(n):
+    out = bytearray([n & 0x7f])
+    n >>= 7
+    while n:
+        out.insert(0, 0x80 | (n & 0x7f))
+        n >>= 7
+    return bytes(out)
+
+def open_midi(name="auto"):
+    if name == "virtual":
+        return VirtualMidiOut()
+    if name.endswith(".mid"):
+        return FileMidiOut(name)
+    if name == "auto":
+        ports = sorted(glob.glob("/dev/snd/midiC*D*"))
+        if not ports:
+            raise RuntimeError("žádné MIDI zařízení v /dev/snd")
+        name = ports[0]
+    return RawMidiOut(name)
+
+# --- MIDI noty z úderů ---
+# note_on() volá detekce při ohlášeném úderu, note_off() při znovuodjištění
+# kanálu (signál klesl pod releaseThreshold). Zpráva se zapíše hned ve
+# vlákně detekce; latence = razítko prvního skenu nad prahem (včetně
+# čekání na špičku) -> dokončený zápis.
+class MidiOutput:
+    def __init__(self, out, channels=8, midi_channel=MIDI_CHANNEL, notes=None):
+        self.out = out
+        self.lock = threading.Lock()
+        self.midi_channel = midi_channel
+        self.notes = bytes((notes or MIDI_NOTES)[:channels])
+        self.velocity = midi_velocity_table()
+        self.playing = array('b', bytes(channels))
+        self.latency = Histogram("midi")
+        self.sent = 0
+        self.errors = 0
+        self.msg = bytearray(3)
+
+    # midi.json: {"channel": 1-16, "notes": [0-127, ...]}; cokoli jiného
+    # se odmítne celé (nota nad 127 by byla stavový bajt)
+    def load(self, path=MIDI_FILE):
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+            channel = data.get("channel", MIDI_CHANNEL + 1)
+            notes = data.get("notes", MIDI_NOTES)
+            if type(channel) is not int or not 1 <= channel <= 16:
+                raise ValueError(f"kanál musí být 1-16: {channel!r}")
+            if not isinstance(notes, list) or not all(type(n) is int and 0 <= n <= 127 for n in notes):
+                raise ValueError(f"noty musí být seznam čísel 0-127: {notes!r}")
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            print("MIDI nastavení nejde načíst:", e)
+            return False
+        self.midi_channel = channel - 1
+        self.notes = bytes(notes[:len(self.playing)]) + self.notes[len(notes):]
+        return True
+
+    def _send(self, status, c, value, stamp):
+        msg = self.msg
+        try:
+            with self.lock:
+                msg[0] = status | self.midi_channel
+                msg[1] = self.notes[c]
+                msg[2] = value
+                self.out.write(msg, stamp)
+        except (OSError, RuntimeError):
+            self.errors += 1
+            return
+        self.sent += 1
+        self.latency.add(time.monotonic_ns() - stamp)
+
+    def note_on(self, c, velocity, stamp):
+        if self.playing[c]:
+            self._send(NOTE_OFF, c, 0, stamp)
+        self.playing[c] = 1
+        self._send(NOTE_ON, c, self.velocity[velocity], stamp)
+
+    def note_off(self, c, stamp):
+        if self.playing[c]:
+            self.playing[c] = 0
+            self._send(NOTE_OFF, c, 0, stamp)
+
+    def close(self):
+        for c in range(len(self.playing)):
+            self.note_off(c, time.monotonic_ns())
+        self.out.close()
+
+    def stats(self):
+        s = self.latency.summary()
+        return (f"MIDI {self.out.name}: {self.sent} zpráv, chyb {self.errors}, latence "
+                f"průměr {s['mean_us']} µs, p99 {s['p99_us']} µs, max {s['max_us']} µs")
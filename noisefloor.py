@@ -0,0 +1,108 @@
+import math
+from array import array
+
+from channels import ADC_MAX
+
+HIT_SIGMAS = 6        # hitThreshold = šum + 6 směrodatných odchylek + rezerva
+RELEASE_SIGMAS = 3
+MARGIN = 8            # rezerva v jednotkách ADC
+DECIMATE = 16         # sledování během hraní: jen každý N-tý sken
+ALPHA = 0.002         # váha nového vzorku v klouzavém průměru
+HOLD = 200000000      # ns po úderu, kdy se vzorky kanálu do šumu nepočítají
+MIN_SAMPLES = 100     # méně vzorků z kalibrace = kanál bez návrhu (None)
+
+# Návrh prahů z průměru a rozptylu šumu
+def suggest(mean, var):
+    std = math.sqrt(max(var, 0.0))
+    hit = min(int(mean + HIT_SIGMAS * std + 0.5) + MARGIN, ADC_MAX)
+    release = min(int(mean + RELEASE_SIGMAS * std + 0.5) + MARGIN // 2, hit - 1)
+    return hit, max(release, 0)
+
+# --- Šum na vstupech ---
+# Další čtenář kruhového bufferu. Během hraní bere každý DECIMATE-tý sken
+# a u kanálů v klidu (žádný úder posledních HOLD ns, hodnota pod prahem)
+# aktualizuje exponenciálně vážený průměr a rozptyl. Kalibrace (pady
+# v klidu) po zadanou dobu sbírá všechny skeny všech kanálů (Welford), i když
+# detektor na šumu spouští, a pak zavolá on_done(seznam (hit, release) nebo
+# None u kanálu s málo vzorky).
+class NoiseTracker:
+    def __init__(self, detector, channels=8, on_done=None):
+        self.detector = detector
+        self.channels = channels
+        self.on_done = on_done
+        self.mean = array('d', bytes(8 * channels))
+        self.var = array('d', bytes(8 * channels))
+        self.seen = array('b', bytes(channels))
+        self.tick = 0
+        self.cal_until = None
+        self.cal_time = 0
+        self.cal_n = array('L', [0] * channels)
+        self.cal_mean = array('d', bytes(8 * channels))
+        self.cal_m2 = array('d', bytes(8 * channels))
+
+    def calibrate(self, seconds):
+        self.cal_time = int(seconds * 1e9)
+        self.cal_until = -1      # začátek podle prvního skenu
+
+    @property
+    def calibrating(self):
+        return self.cal_until is not None
+
+    def callback(self, adc, base, now):
+        if self.cal_until is not None:
+            self._calibrate(adc, base, now)
+            return
+        self.tick += 1
+        if self.tick % DECIMATE:
+            return
+        det = self.detector
+        mean = self.mean
+        var = self.var
+        for c in range(self.channels):
+            v = adc[base + c]
+            if det.scanning[c] or now - det.last_hit[c] < HOLD or v >= det.hit_threshold[c]:
+                continue
+            if not self.seen[c]:
+                self.seen[c] = 1
+                mean[c] = v
+                continue
+            d = v - mean[c]
+            mean[c] += ALPHA * d
+            var[c] = (1 - ALPHA) * (var[c] + ALPHA * d * d)
+
+    def _calibrate(self, adc, base, now):
+        if self.cal_until < 0:
+            self.cal_until = now + self.cal_time
+            for c in range(self.channels):
+                self.cal_n[c] = 0
+                self.cal_mean[c] = 0.0
+                self.cal_m2[c] = 0.0
+        count = self.cal_n
+        mean = self.cal_mean
+        m2 = self.cal_m2
+        for c in range(self.channels):
+            v = adc[base + c]
+            count[c] += 1
+            d = v - mean[c]
+            mean[c] += d / count[c]
+            m2[c] += d * (v - mean[c])
+        if now >= self.cal_until:
+            result = []
+            for c in range(self.channels):
+                n = count[c]
+                if n < MIN_SAMPLES:
+                    result.append(None)
+                    continue
+                var = m2[c] / (n - 1)
+                # Sledování driftu pokračuje od naměřeného šumu
+                self.mean[c] = mean[c]
+                self.var[c] = var
+                self.seen[c] = 1
+                result.append(suggest(mean[c], var))
+            self.cal_until = None
+            if self.on_done:
+                self.on_done(result)
+
+    # Aktuální návrh prahů podle sledovaného šumu
+    def current(self, c):
+        return suggest(self.mean[c], self.var[c]) if self.seen[c] else None
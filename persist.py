@@ -0,0 +1,142 @@
+import os
+import struct
+import threading
+import time
+
+from bankfile import encode_bank, export_json, import_json, is_bank, read_bank
+from channels import bank_to_data, bank_from_data, fit_bank
+
+SAVE_DELAY = 2.0   # s klidu po poslední změně, než se uloží
+
+# --- Ukládání presetů na pozadí ---
+# UI jen označí změněný kanál (mark_dirty) - uloží se kopie jeho nastavení
+# do paměti. Vlákno po SAVE_DELAY s klidu zapíše celý soubor atomicky:
+# dočasný soubor, fsync, rename, fsync adresáře. Víc změn za sebou = jeden
+# zápis, a pokud se obsah od posledního uložení nezměnil, nezapisuje se nic.
+# Soubor .json se ukládá jako JSON, cokoli jiného jako binární banka
+# (bankfile.py); při čtení se formát pozná podle obsahu.
+class PresetStore(threading.Thread):
+    def __init__(self, path="presets.bin", delay=SAVE_DELAY):
+        super().__init__(name="preset-store", daemon=True)
+        self.path = path
+        self.binary = not path.endswith(".json")
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.running = True
+        self.data = None
+        self.current = 0
+        self.dirty = set()
+        self.last_change = 0.0
+        self.urgent = False
+        self.saved = None
+        self.saves = 0
+        self.skipped = 0
+
+    # Načtení při startu: (bank, aktuální preset) nebo (None, 0). Binární
+    # banka se čte přes mmap (bankfile.read_bank) rovnou do ChannelConfig.
+    def load(self, presets, channels, sound='Empty'):
+        try:
+            with open(self.path, "rb") as f:
+                binary = is_bank(f.read(4))
+                if not binary:
+                    f.seek(0)
+                    raw = f.read()
+            if binary:
+                configs, current = read_bank(self.path)
+                bank = fit_bank(configs, presets, channels, sound)
+            else:
+                data, current = import_json(raw.decode("utf-8"))
+                bank = bank_from_data(data, presets, channels, sound)
+        except FileNotFoundError:
+            return None, 0
+        except Exception as e:
+            print("Presety nejde načíst:", e)
+            return None, 0
+        if not binary:
+            self.saved = raw
+        return bank, min(max(current, 0), presets - 1)
+
+    def attach(self, bank, current=0):
+        with self.lock:
+            self.data = bank_to_data(bank)
+            self.current = current
+
+    def mark_dirty(self, bank, p, c):
+        with self.lock:
+            self.data[p][c] = bank[p][c].to_dict()
+            self.dirty.add((p, c))
+            self.last_change = time.monotonic()
+        self.wakeup.set()
+
+    def set_current(self, current):
+        with self.lock:
+            self.current = current
+            self.dirty.add((current, None))
+            self.last_change = time.monotonic()
+        self.wakeup.set()
+
+    # Uložit hned po uklidnění (konec editace), bez čekání na delay
+    def request_save(self):
+        self.urgent = True
+        self.wakeup.set()
+
+    def _snapshot(self):
+        with self.lock:
+            if not self.dirty:
+                return None
+            self.dirty.clear()
+            if self.binary:
+                return encode_bank(self.data, self.current)
+            return export_json(self.data, self.current).encode("utf-8")
+
+    def write(self, raw):
+        if raw == self.saved:
+            self.skipped += 1
+            return
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(raw)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        try:
+            fd = os.open(os.path.dirname(os.path.abspath(self.path)), os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        except OSError:
+            pass
+        self.saved = raw
+        self.saves += 1
+
+    def run(self):
+        while self.running:
+            self.wakeup.wait()
+            self.wakeup.clear()
+            # Počkat na klid, další změny mezitím posouvají termín
+            while self.running and not self.urgent:
+                wait = self.last_change + self.delay - time.monotonic()
+                if wait <= 0:
+                    break
+                self.wakeup.wait(wait)
+                self.wakeup.clear()
+            self.urgent = False
+            self.flush()
+
+    # Chyba kódování (nepřevoditelná hodnota) ani zápisu nesmí ukončit vlákno
+    def flush(self):
+        try:
+            raw = self._snapshot()
+            if raw is not None:
+                self.write(raw)
+        except (OSError, ValueError, struct.error) as e:
+            print("Presety nejde uložit:", e)
+
+    def stop(self):
+        self.running = False
+        self.wakeup.set()
+        if self.is_alive():
+            self.join()
+        self.flush()
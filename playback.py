@@ -0,0 +1,276 @@
+import queue
+import sys
+import threading
+import time
+import wave
+from array import array
+
+SAMPLE_RATE = 44100
+BLOCK_SIZE = 128
+MAX_VOICES = 16          # mix je čistý Python: 16 hlasů ~ 14 % bloku na x86; na Pi změřit (python playback.py) a případně snížit
+NUM_CHANNELS = 8
+GAIN_SHIFT = 15          # zesílení ve fixed-pointu, 1.0 = 1 << 15
+
+# --- Načtení WAV do paměti (mono, 16 bit, SAMPLE_RATE) ---
+def load_wav(path, rate=SAMPLE_RATE):
+    with wave.open(path, "rb") as w:
+        width = w.getsampwidth()
+        nch = w.getnchannels()
+        src_rate = w.getframerate()
+        raw = w.readframes(w.getnframes())
+    return pcm_to_mono16(raw, width, nch, src_rate, rate)
+
+def pcm_to_mono16(raw, width, nch, src_rate, rate=SAMPLE_RATE):
+    if width == 2:
+        data = array('h')
+        data.frombytes(raw[:len(raw) - len(raw) % 2])
+        if sys.byteorder == "big":
+            data.byteswap()
+    elif width == 1:
+        data = array('h', [(b - 128) << 8 for b in raw])
+    elif width in (3, 4):
+        # 24/32 bit little-endian -> horních 16 bitů
+        data = array('h', [int.from_bytes(raw[i + width - 2:i + width], "little", signed=True)
+                           for i in range(0, len(raw) - width + 1, width)])
+    else:
+        raise ValueError(f"Nepodporovaná šířka vzorku: {width} B")
+    if nch > 1:
+        data = array('h', [sum(data[i:i + nch]) // nch for i in range(0, len(data) - nch + 1, nch)])
+    if src_rate != rate:
+        # Převzorkování nejbližším sousedem, stačí pro jednorázové údery
+        n = int(len(data) * rate / src_rate)
+        data = array('h', [data[i * src_rate // rate] for i in range(n)])
+    return data
+
+# --- Mixér hlasů ---
+# Trigger z detekčního vlákna jde přes frontu, render() běží v audio callbacku.
+# Hlasy jsou v předalokovaných polích, počet je omezený (krade se nejstarší).
+class Mixer:
+    def __init__(self, block_size=BLOCK_SIZE, max_voices=MAX_VOICES, channels=NUM_CHANNELS):
+        self.block_size = block_size
+        self.max_voices = max_voices
+        self.sounds = [None] * channels
+        self.voice_data = [None] * max_voices
+        self.voice_pos = array('l', [0] * max_voices)
+        self.voice_gain = array('l', [0] * max_voices)
+        self.voice_age = array('l', [0] * max_voices)
+        # 'q': součet hlasů přeteče 32 bitů ('l' na 32bitovém Pi OS)
+        self.acc = array('q', [0] * block_size)
+        self.out = array('h', [0] * block_size)
+        self.triggers = queue.SimpleQueue()
+        self.blocks = 0
+        self.stolen = 0
+        self.latencies = []    # ns: trigger -> začátek bloku, ve kterém hlas zazní
+
+    def set_sound(self, c, data):
+        self.sounds[c] = data
+
+    # velocity 0-100, volume 1-10
+    def trigger(self, c, velocity, volume, stamp=None):
+        self.trigger_gain(c, (velocity * volume << GAIN_SHIFT) // 1000, stamp)
+
+    # gain už předpočítaný (velocity.py), 1.0 = 1 << GAIN_SHIFT
+    def trigger_gain(self, c, gain, stamp=None):
+        self.triggers.put((c, gain, time.monotonic_ns() if stamp is None else stamp))
+
+    def _start_voices(self, now):
+        while not self.triggers.empty():
+            c, gain, stamp = self.triggers.get()
+            data = self.sounds[c]
+            if data is None or gain <= 0:
+                continue
+            free = -1
+            oldest = 0
+            for v in range(self.max_voices):
+                if self.voice_data[v] is None:
+                    free = v
+                    break
+                if self.voice_age[v] < self.voice_age[oldest]:
+                    oldest = v
+            if free < 0:
+                free = oldest
+                self.stolen += 1
+            self.voice_data[free] = data
+            self.voice_pos[free] = 0
+            self.voice_gain[free] = gain
+            self.voice_age[free] = self.blocks
+            if len(self.latencies) < 4096:
+                self.latencies.append(now - stamp)
+
+    def render(self):
+        self._start_voices(time.monotonic_ns())
+        acc = self.acc
+        n = self.block_size
+        mixed = False
+        for v in range(self.max_voices):
+            data = self.voice_data[v]
+            if data is None:
+                continue
+            pos = self.voice_pos[v]
+            gain = self.voice_gain[v]
+            count = min(n, len(data) - pos)
+            # Celý úsek najednou (comprehension místo indexování po vzorcích)
+            if mixed:
+                acc[:count] = array('q', [a + s * gain for a, s in zip(acc, data[pos:pos + count])])
+            else:
+                acc[:count] = array('q', [s * gain for s in data[pos:pos + count]])
+                for i in range(count, n):
+                    acc[i] = 0
+                mixed = True
+            if pos + count >= len(data):
+                self.voice_data[v] = None
+            else:
+                self.voice_pos[v] = pos + count
+        out = self.out
+        if not mixed:
+            for i in range(n):
+                out[i] = 0
+        else:
+            out[:] = array('h', [32767 if s > 32767 else (-32768 if s < -32768 else s)
+                                 for s in [a >> GAIN_SHIFT for a in acc]])
+        self.blocks += 1
+        return out
+
+    def active_voices(self):
+        return sum(1 for d in self.voice_data if d is not None)
+
+# --- Výstupy ---
+# Null/File výstup pouští render() ve vlastním vlákně (v reálném čase nebo
+# co nejrychleji) a měří čas výpočtu bloku; SoundDeviceSink jde přes audio callback.
+class BlockSink:
+    def __init__(self, realtime=True):
+        self.realtime = realtime
+        self.running = False
+        self.thread = None
+        self.render_time = 0.0
+        self.render_max = 0.0
+        self.blocks = 0
+
+    def write(self, block):
+        pass
+
+    def close(self):
+        pass
+
+    def start(self, mixer):
+        self.mixer = mixer
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="audio", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        period = self.mixer.block_size / SAMPLE_RATE
+        deadline = time.monotonic()
+        while self.running:
+            t = time.perf_counter()
+            block = self.mixer.render()
+            dt = time.perf_counter() - t
+            self.render_time += dt
+            if dt > self.render_max:
+                self.render_max = dt
+            self.blocks += 1
+            self.write(block)
+            if self.realtime:
+                deadline += period
+                delay = deadline - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+        self.close()
+
+    def stats(self):
+        period = self.mixer.block_size / SAMPLE_RATE
+        mean = self.render_time / self.blocks if self.blocks else 0.0
+        lat = sorted(self.mixer.latencies)
+        return {
+            "blocks": self.blocks,
+            "block_ms": period * 1000,
+            "render_mean_ms": mean * 1000,
+            "render_max_ms": self.render_max * 1000,
+            "cpu_load": mean / period,
+            "trigger_latency_max_ms": lat[-1] / 1e6 + period * 1000 if lat else None,
+            "voices_stolen": self.mixer.stolen,
+        }
+
+class NullSink(BlockSink):
+    pass
+
+class FileSink(BlockSink):
+    def __init__(self, path, realtime=False):
+        super().__init__(realtime)
+        self.wav = wave.open(path, "wb")
+        self.wav.setnchannels(1)
+        self.wav.setsampwidth(2)
+        self.wav.setframerate(SAMPLE_RATE)
+
+    def write(self, block):
+        if sys.byteorder == "big":
+            block = array('h', block)
+            block.byteswap()
+        self.wav.writeframesraw(block)
+
+    def close(self):
+        self.wav.close()
+
+class SoundDeviceSink(BlockSink):
+    def start(self, mixer):
+        sounddevice = _sounddevice()
+        if sounddevice is None:
+            raise RuntimeError("sounddevice není nainstalované")
+        self.mixer = mixer
+
+        def callback(outdata, frames, time_info, status):
+            t = time.perf_counter()
+            outdata[:] = mixer.render().tobytes()
+            dt = time.perf_counter() - t
+            self.render_time += dt
+            self.render_max = max(self.render_max, dt)
+            self.blocks += 1
+
+        self.stream = sounddevice.RawOutputStream(samplerate=SAMPLE_RATE, blocksize=mixer.block_size,
+                                                  channels=1, dtype='int16', latency='low',
+                                                  callback=callback)
+        self.stream.start()
+
+    def stop(self):
+        self.stream.stop()
+        self.stream.close()
+
+# Import sounddevice inicializuje PortAudio a prochází zařízení ALSA, proto
+# až při otevření výstupu (na pozadí), ne při importu modulu
+def _sounddevice():
+    try:
+        import sounddevice
+    except (ImportError, OSError):
+        return None
+    return sounddevice
+
+def open_sink(name="auto"):
+    if name == "null":
+        return NullSink()
+    if name.endswith(".wav"):
+        return FileSink(name)
+    if _sounddevice() is not None:
+        return SoundDeviceSink()
+    print("sounddevice chybí, zvuk jde do NullSink")
+    return NullSink()
+
+# --- Měření na obyčejném Linuxu: python playback.py sample.wav [hlasů] ---
+if __name__ == "__main__":
+    mixer = Mixer()
+    data = load_wav(sys.argv[1]) if len(sys.argv) > 1 else array('h', [10000] * SAMPLE_RATE)
+    voices = int(sys.argv[2]) if len(sys.argv) > 2 else MAX_VOICES
+    for c in range(NUM_CHANNELS):
+        mixer.set_sound(c, data)
+    sink = NullSink(realtime=True)
+    sink.start(mixer)
+    for i in range(voices):
+        mixer.trigger(i % NUM_CHANNELS, 100, 10)
+    time.sleep(1.0)
+    sink.stop()
+    for k, v in sink.stats().items():
+        print(f"{k}: {v}")
@@ -0,0 +1,118 @@
+import ctypes
+import gc
+import os
+import sys
+import threading
+
+RT_PRIORITY = 50         # SCHED_FIFO priorita akvizice, detekce o 1 níž
+SWITCH_INTERVAL = 0.001  # s, jak často se předává GIL (výchozí 5 ms)
+GC_THRESHOLD = 20000     # alokací mezi automatickými úklidy nejmladší generace (výchozí 700)
+MCL_CURRENT = 1
+MCL_FUTURE = 2
+THREAD_STACK = 256 * 1024   # B, zásobník nových vláken (výchozí 8 MiB by se celý zamkl)
+
+# --- Režim reálného času pro skenování (--realtime) ---
+# Akvizice a detekce běží na vyhrazeném jádře (poslední dostupné) se
+# SCHED_FIFO, ostatní vlákna se tomu jádru vyhýbají. Paměť procesu je
+# zamčená (mlockall), aby skenování nečekalo na výpadky stránek; nová vlákna
+# proto dostanou malý zásobník, jinak by se každému zamklo celých 8 MiB.
+# Objekty ze startu jsou zmrazené (GC je už neprochází) a automatický GC má
+# zvednutý práh, takže běží zřídka, ale prochází všechny generace (cykly
+# neunikají). Úklid v jiném vlákně by kvůli GIL zastavil skenování stejně,
+# proto se celá paměť uklízí jen v klidu (idle_point, konec editace).
+# Každé opatření se zkouší zvlášť;
+# co nejde (chybí práva, jiný systém), se jen zapíše do výsledků.
+class RealtimeMode:
+    def __init__(self, priority=RT_PRIORITY, cpu=None):
+        self.priority = priority
+        self.lock = threading.Lock()
+        self.results = []        # (opatření, povedlo se, podrobnosti)
+        try:
+            cpus = sorted(os.sched_getaffinity(0))
+        except (AttributeError, OSError):
+            cpus = []
+        self.cpus = cpus
+        self.cpu = cpu if cpu is not None else (cpus[-1] if len(cpus) > 1 else None)
+
+    def _note(self, measure, ok, detail=""):
+        with self.lock:
+            self.results.append((measure, ok, detail))
+
+    # Jednou z hlavního vlákna, před spuštěním pracovních vláken
+    def setup_process(self):
+        try:
+            threading.stack_size(THREAD_STACK)
+            self._note("zásobník vláken", True, f"{THREAD_STACK // 1024} KiB")
+        except (ValueError, RuntimeError) as e:
+            self._note("zásobník vláken", False, str(e))
+
+        try:
+            libc = ctypes.CDLL(None, use_errno=True)
+            if libc.mlockall(MCL_CURRENT | MCL_FUTURE) != 0:
+                raise OSError(ctypes.get_errno(), os.strerror(ctypes.get_errno()))
+            self._note("mlockall", True)
+        except (OSError, AttributeError) as e:
+            self._note("mlockall", False, str(e))
+
+        if self.cpu is None:
+            self._note("vyhrazené jádro", False, "jen jedno dostupné CPU")
+        else:
+            try:
+                os.sched_setaffinity(0, [c for c in self.cpus if c != self.cpu])
+                self._note("vyhrazené jádro", True, f"CPU {self.cpu}, ostatní vlákna {len(self.cpus) - 1} CPU")
+            except (AttributeError, OSError) as e:
+                self._note("vyhrazené jádro", False, str(e))
+
+        sys.setswitchinterval(SWITCH_INTERVAL)
+        self._note("přepínání GIL", True, f"{SWITCH_INTERVAL * 1000:g} ms")
+
+    # Volá každé pracovní vlákno na začátku run(); offset snižuje prioritu
+    def setup_thread(self, name, offset=0):
+        if self.cpu is not None:
+            try:
+                os.sched_setaffinity(0, [self.cpu])
+            except (AttributeError, OSError) as e:
+                self._note(f"{name}: CPU {self.cpu}", False, str(e))
+        try:
+            prio = self.priority - offset
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(prio))
+            self._note(f"{name}: SCHED_FIFO", True, f"priorita {prio}")
+        except (AttributeError, OSError) as e:
+            self._note(f"{name}: SCHED_FIFO", False, str(e))
+
+    # Po dokončení startu: co přežilo start, GC už nikdy neprochází
+    def setup_gc(self):
+        gc.collect()
+        if hasattr(gc, "freeze"):
+            gc.freeze()
+        _, gen1, gen2 = gc.get_threshold()
+        gc.set_threshold(GC_THRESHOLD, gen1, gen2)
+        self._note("GC", True, f"zmrazeno {gc.get_freeze_count() if hasattr(gc, 'get_freeze_count') else '?'} objektů, "
+                               f"práh {GC_THRESHOLD}, úplný úklid v klidu")
+
+    # Skutečný klid (konec editace): uklidit všechny generace
+    def idle_point(self):
+        gc.collect()
+
+    def report(self):
+        with self.lock:
+            results = list(self.results)
+        lines = ["Režim reálného času:"]
+        for measure, ok, detail in results:
+            lines.append(f"  {'OK ' if ok else 'NE '} {measure}" + (f" ({detail})" if detail else ""))
+        locked = locked_kib()
+        if locked is not None:
+            lines.append(f"  zamčená paměť {locked / 1024:.1f} MiB")
+        return "\n".join(lines)
+
+# Skutečně zamčené stránky procesu v KiB, None mimo Linux. VmLck ze status
+# počítá i jen rezervované oblasti (arény malloc), proto smaps_rollup.
+def locked_kib():
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Locked:"):
+                    return int(line.split()[1])
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
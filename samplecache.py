@@ -0,0 +1,153 @@
+import mmap
+import os
+import struct
+import sys
+import threading
+from collections import OrderedDict
+
+from playback import SAMPLE_RATE, load_wav
+
+DEFAULT_BUDGET = 64 * 1024 * 1024
+
+# --- Hlavička WAV: (formát, kanály, frekvence, bitů, offset dat, délka dat) ---
+def read_wav_header(f):
+    riff = f.read(12)
+    if len(riff) < 12 or riff[:4] != b"RIFF" or riff[8:12] != b"WAVE":
+        raise ValueError("Není WAV")
+    fmt = None
+    while True:
+        chunk = f.read(8)
+        if len(chunk) < 8:
+            raise ValueError("WAV bez datového bloku")
+        cid, size = struct.unpack("<4sI", chunk)
+        if cid == b"fmt ":
+            body = f.read(size + (size & 1))
+            fmt = struct.unpack("<HHIIHH", body[:16])
+        elif cid == b"data":
+            if fmt is None:
+                raise ValueError("WAV bez fmt bloku")
+            tag, nch, rate, _, _, bits = fmt
+            return tag, nch, rate, bits, f.tell(), size
+        else:
+            f.seek(size + (size & 1), os.SEEK_CUR)
+
+# Mono 16bit PCM ve frekvenci mixéru jde namapovat přímo, bez kopie
+def can_map(tag, nch, rate, bits):
+    return tag == 1 and nch == 1 and bits == 16 and rate == SAMPLE_RATE and sys.byteorder == "little"
+
+# --- LRU cache samplů s limitem paměti ---
+# Samply aktuálního presetu jsou připnuté (pin) a nevyhazují se. Nepřipnuté
+# se vyhazují od nejdéle nepoužitého, jakmile součet přesáhne budget.
+# Načítání běží na pozadí; po načtení se zavolá on_ready(name, data).
+class SampleCache:
+    def __init__(self, path, budget=DEFAULT_BUDGET, on_ready=None):
+        self.path = path
+        self.budget = budget
+        self.on_ready = on_ready
+        self.entries = OrderedDict()     # jméno -> pole vzorků / memoryview
+        self.sizes = {}
+        self.used = 0
+        self.pinned = set()
+        self.failed = set()              # neexistující/vadné soubory se znovu nezkouší
+        self.pending = []                # zásobník, nejnovější požadavek první
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.running = True
+        self.mapped = 0
+        self.decoded = 0
+        self.evicted = 0
+        self.thread = threading.Thread(target=self._run, name="sample-cache", daemon=True)
+        self.thread.start()
+
+    def get(self, name):
+        with self.lock:
+            data = self.entries.get(name)
+            if data is not None:
+                self.entries.move_to_end(name)
+            return data
+
+    # Připne sady samplů (typicky zvuky kanálů aktuálního presetu)
+    def pin(self, names):
+        with self.lock:
+            self.pinned = set(names)
+            for name in names:
+                if name not in self.entries and name not in self.pending and name not in self.failed:
+                    self.pending.append(name)
+            self._evict()
+        self.wakeup.set()
+
+    def _file(self, name):
+        return os.path.join(self.path, name + ".wav")
+
+    def _load(self, name):
+        fname = self._file(name)
+        with open(fname, "rb") as f:
+            tag, nch, rate, bits, offset, size = read_wav_header(f)
+            if can_map(tag, nch, rate, bits):
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                size = min(size, len(mm) - offset) & ~1
+                self.mapped += 1
+                return memoryview(mm)[offset:offset + size].cast('h'), size
+        data = load_wav(fname)
+        self.decoded += 1
+        return data, len(data) * data.itemsize
+
+    def _evict(self):
+        # Volat se zámkem; mmap se nezavírá, uvolní se až s posledním hlasem
+        for name in list(self.entries):
+            if self.used <= self.budget:
+                break
+            if name in self.pinned:
+                continue
+            del self.entries[name]
+            self.used -= self.sizes.pop(name)
+            self.evicted += 1
+
+    def _run(self):
+        while self.running:
+            self.wakeup.wait()
+            self.wakeup.clear()
+            while self.running:
+                with self.lock:
+                    name = None
+                    while self.pending:
+                        candidate = self.pending.pop()
+                        # Mezitím odvybrané samply (rychlé listování) se nenačítají
+                        if candidate in self.pinned and candidate not in self.entries:
+                            name = candidate
+                            break
+                if name is None:
+                    break
+                try:
+                    data, size = self._load(name)
+                except Exception as e:
+                    # Chybějící soubor ("Empty", "Card Error!") není chyba
+                    if not isinstance(e, FileNotFoundError):
+                        print("Chyba při načítání samplu:", name, e)
+                    with self.lock:
+                        self.failed.add(name)
+                    continue
+                with self.lock:
+                    self.entries[name] = data
+                    self.sizes[name] = size
+                    self.used += size
+                    self._evict()
+                if self.on_ready is not None:
+                    self.on_ready(name, data)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "used": self.used,
+                "budget": self.budget,
+                "pinned": len(self.pinned),
+                "mapped": self.mapped,
+                "decoded": self.decoded,
+                "evicted": self.evicted,
+            }
+
+    def close(self):
+        self.running = False
+        self.wakeup.set()
+        self.thread.join()
@@ -0,0 +1,54 @@
+from random import Random
+
+RANDOM_TABLE = 256   # délka předpočítané náhodné sekvence (úderů)
+
+# --- Rozhodování, na které údery kanál zahraje ---
+# Pro každý kanál je předpočítaná tabulka 0/1 podle počtu úderů; při úderu
+# se jen podívá na table[počet % délka]. Tabulky se staví jen při změně
+# nastavení (configure / load_preset), ne při úderu.
+#   Fix:    hraje na pozici playPosition v každých playEvery úderech
+#           (půlkroky, např. 1.5 = 2 ze 3 úderů)
+#   Random: další zahrání za náhodný počet úderů mezi randomFrom a randomTo
+
+def fixed_table(every, position):
+    period = int(every) if float(every).is_integer() else int(every * 2)
+    table = bytearray(period)
+    offset = (position - 1) % every
+    for m in range(round(period / every)):
+        table[int(offset + m * every) % period] = 1
+    return bytes(table)
+
+def random_table(low, high, choices, rng, size=RANDOM_TABLE):
+    gaps = [g for g in choices if low <= g <= high] or [low]
+    table = bytearray(size)
+    pos = 0.0
+    while pos < size:
+        table[int(pos)] = 1
+        pos += rng.choice(gaps)
+    return bytes(table)
+
+class Sequencer:
+    def __init__(self, options, channels=8, seed=None):
+        self.options = options
+        self.rng = Random(seed)
+        self.tables = [b"\x01"] * channels
+
+    # ch = ChannelConfig (channels.py)
+    def build(self, ch):
+        options = self.options
+        if ch.playFix:
+            return fixed_table(options[ch.playEvery], options[ch.playPosition])
+        low, high = sorted((options[ch.randomFrom], options[ch.randomTo]))
+        return random_table(low, high, options, self.rng)
+
+    def configure(self, c, ch):
+        self.tables[c] = self.build(ch)
+
+    def load_preset(self, channels):
+        for c, ch in enumerate(channels):
+            self.configure(c, ch)
+
+    # count = počet úderů kanálu před tímto (barCount)
+    def fires(self, c, count):
+        table = self.tables[c]
+        return table[count % len(table)]
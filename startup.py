@@ -0,0 +1,70 @@
+import os
+import threading
+import time
+
+# --- Měření studeného startu ---
+# Čas se počítá od spuštění procesu (z /proc/self/stat, tedy i start
+# interpretu a importy), jinak od importu tohoto modulu. Fáze v hlavním
+# vlákně jdou za sebou, fáze na pozadí mají vlastní začátek i konec.
+
+def process_start():
+    try:
+        with open("/proc/self/stat") as f:
+            # Jméno procesu může obsahovat mezery, pole se počítají od ')'
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        ticks = os.sysconf("SC_CLK_TCK")
+        age = uptime - int(fields[19]) / ticks
+        return time.monotonic() - max(age, 0.0)
+    except (OSError, ValueError, IndexError):
+        return time.monotonic()
+
+class StartupTimer:
+    def __init__(self):
+        self.t0 = process_start()
+        self.last = self.t0
+        self.phases = []        # (jméno, začátek, trvání) v s od startu procesu
+        self.ready = None
+        self.failed = {}        # jméno fáze -> chyba
+        self.lock = threading.Lock()
+        self.phase("python")
+
+    # Konec fáze v hlavním vlákně (trvá od konce předchozí)
+    def phase(self, name):
+        now = time.monotonic()
+        with self.lock:
+            self.phases.append((name, self.last - self.t0, now - self.last))
+        self.last = now
+
+    # Fáze běžící souběžně (vlákno na pozadí); výjimka se zapíše a projde dál
+    def measure(self, name, fn, *args):
+        start = time.monotonic()
+        try:
+            return fn(*args)
+        except Exception as e:
+            self.fail(name, e)
+            raise
+        finally:
+            with self.lock:
+                self.phases.append((name, start - self.t0, time.monotonic() - start))
+
+    def fail(self, name, error):
+        with self.lock:
+            self.failed[name] = f"{type(error).__name__}: {error}"
+
+    def mark_ready(self):
+        self.ready = time.monotonic() - self.t0
+
+    def report(self):
+        with self.lock:
+            phases = sorted(self.phases, key=lambda p: p[1])
+            failed = dict(self.failed)
+        lines = [f"Připraveno k detekci za {self.ready * 1000:.1f} ms" if self.ready is not None
+                 else "Detekce ještě neběží"]
+        for name, start, duration in phases:
+            lines.append(f"  {name:<12} {start * 1000:8.1f} ms  +{duration * 1000:7.1f} ms"
+                         + (f"  CHYBA {failed.pop(name)}" if name in failed else ""))
+        for name, error in failed.items():
+            lines.append(f"  {name:<12} CHYBA {error}")
+        return "\n".join(lines)
@@ -0,0 +1,70 @@
+import math
+from array import array
+
+from playback import GAIN_SHIFT
+
+ADC_RANGE = 4096
+MAX_VELOCITY = 100
+MAX_POINTS = 8
+CURVES = ('lin', 'log', 'exp', 'custom')
+
+# --- Křivky dynamiky: ADC -> velocity -> zesílení ---
+# Pro každý kanál se při změně nastavení předpočítají dvě tabulky o 4096
+# položkách: velocity (0-100) a výsledné zesílení samplu včetně
+# channelVolume (fixed-point, 1.0 = 1 << GAIN_SHIFT). Při úderu se jen
+# indexuje špičkou z ADC.
+#   sensitivity: % zesílení vstupu (200 = plná velocity už v půlce rozsahu)
+#   curvePoints: [[adc, velocity], ...] pro křivku 'custom'
+
+def _interpolate(points, v):
+    x0, y0 = 0, 0
+    for x1, y1 in points:
+        if v <= x1:
+            return y0 + (y1 - y0) * (v - x0) / (x1 - x0) if x1 > x0 else y1
+        x0, y0 = x1, y1
+    x1, y1 = ADC_RANGE - 1, MAX_VELOCITY
+    return y0 + (y1 - y0) * (v - x0) / (x1 - x0) if x1 > x0 else y1
+
+def curve_value(curve, x):
+    if curve == 'log':
+        return math.log10(1 + 9 * x)
+    if curve == 'exp':
+        return (10 ** x - 1) / 9
+    return x
+
+def velocity_table(curve='lin', sensitivity=100, points=()):
+    table = array('B', bytes(ADC_RANGE))
+    points = sorted(points)[:MAX_POINTS]
+    top = ADC_RANGE - 1
+    for v in range(ADC_RANGE):
+        scaled = min(v * sensitivity / 100, top)
+        if curve == 'custom' and points:
+            vel = _interpolate(points, scaled)
+        else:
+            vel = curve_value(curve, scaled / top) * MAX_VELOCITY
+        table[v] = min(max(int(vel + 1e-9), 0), MAX_VELOCITY)
+    return table
+
+# Stejný vzorec jako Mixer.trigger: velocity 0-100 * volume 1-10
+def gain_table(velocities, volume):
+    return array('l', [(vel * volume << GAIN_SHIFT) // 1000 for vel in velocities])
+
+class VelocityMap:
+    def __init__(self, channels=8):
+        linear = velocity_table()
+        self.velocity = [linear] * channels
+        self.gain = [gain_table(linear, 10)] * channels
+        self.keys = [None] * channels
+
+    # ch = ChannelConfig (channels.py); tabulka velocity se staví jen při
+    # změně křivky, samotná hlasitost přepočítá jen zesílení
+    def configure(self, c, ch):
+        key = (ch.velocityCurve, ch.sensitivity, tuple(map(tuple, ch.curvePoints)))
+        if key != self.keys[c]:
+            self.velocity[c] = velocity_table(*key)
+            self.keys[c] = key
+        self.gain[c] = gain_table(self.velocity[c], ch.channelVolume)
+
+    def load_preset(self, channels):
+        for c, ch in enumerate(channels):
+            self.configure(c, ch)